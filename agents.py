@@ -2,12 +2,30 @@ from langchain.agents import Tool
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
 from langchain_community.tools import TavilySearchResults
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+from collections import Counter
 from vector_store import ChromaVectorStore
 from llm_config import get_llm
+from rule_parser import RuleBasedQueryParser
+from cache import LRUTTLCache, normalize_query
+from reranker import Reranker
+from concurrency import run_blocking
+import os
 
 class InputParserAgent:
-    def __init__(self):
+    """Structures the user's query.
+
+    mode="rules" parses locally, mode="llm" always asks the LLM, and
+    mode="auto" uses the local parser unless the query is long or the parse
+    is ambiguous. `stats` counts how often each path is taken.
+    """
+    def __init__(self, mode: str = None, max_rule_words: int = None):
+        self.mode = mode or os.getenv("PARSER_MODE", "auto")
+        if self.mode not in ("auto", "rules", "llm"):
+            raise ValueError(f"Unknown parser mode: {self.mode}")
+        self.max_rule_words = max_rule_words or int(os.getenv("PARSER_MAX_RULE_WORDS", "24"))
+        self.rule_parser = RuleBasedQueryParser()
+        self.stats = Counter(rules=0, llm=0)
         self.llm = get_llm()
         self.prompt = PromptTemplate.from_template(
             """You are an input parsing agent. Your role is to analyze and structure the user's query.
@@ -22,32 +40,135 @@ class InputParserAgent:
             """
         )
 
+    def _rule_parse(self, query: str) -> Dict[str, Any]:
+        """Local parse, or None when the policy says the LLM should handle it"""
+        if self.mode == "llm":
+            return None
+        parsed = self.rule_parser.parse(query)
+        if self.mode == "auto" and (parsed["ambiguous"] or parsed["word_count"] > self.max_rule_words):
+            return None
+        self.stats["rules"] += 1
+        return {
+            "parsed_query": self.rule_parser.format(parsed),
+            **parsed,
+            "parser": "rules"
+        }
+
     def parse_input(self, query: str) -> Dict[str, Any]:
         """Parse and structure the user's input query"""
+        parsed = self._rule_parse(query)
+        if parsed is not None:
+            return parsed
+        self.stats["llm"] += 1
         response = self.llm.invoke(self.prompt.format(query=query))
-        return {"parsed_query": response.content}
+        return {"parsed_query": response.content, "parser": "llm"}
+
+    async def aparse_input(self, query: str) -> Dict[str, Any]:
+        """Async variant of parse_input"""
+        parsed = self._rule_parse(query)
+        if parsed is not None:
+            return parsed
+        self.stats["llm"] += 1
+        response = await self.llm.ainvoke(self.prompt.format(query=query))
+        return {"parsed_query": response.content, "parser": "llm"}
 
 class RetrievalAgent:
-    def __init__(self, vector_store: ChromaVectorStore):
+    """Retrieval from the vector store.
+
+    The default hybrid mode fuses dense similarity with BM25 over the same
+    chunks, so exact-term queries (IDs, error codes) still find their
+    documents. Dense mode uses similarity search alone.
+
+    With RETRIEVAL_RERANK set to "mmr" or "cross_encoder", RERANK_FETCH_K
+    candidates are fetched together with their stored embeddings and a
+    `Reranker` picks a diverse top-k from them.
+    """
+    def __init__(self, vector_store: ChromaVectorStore, mode: str = None):
         self.vector_store = vector_store
-        self.llm = get_llm()
+        self.mode = mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+        if self.mode not in ("hybrid", "dense"):
+            raise ValueError(f"Unknown retrieval mode: {self.mode}")
+        self.fetch_k = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+        self.rrf_k = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+        rerank = os.getenv("RETRIEVAL_RERANK", "none")
+        self.reranker = Reranker(
+            strategy=rerank,
+            lambda_mult=float(os.getenv("RERANK_LAMBDA", "0.7"))
+        ) if rerank != "none" else None
+        self.rerank_fetch_k = int(os.getenv("RERANK_FETCH_K", "50"))
+
+    @property
+    def ranked(self) -> bool:
+        """Whether results come back in an order other than plain distance order"""
+        return self.mode == "hybrid" or self.reranker is not None
+
+    def _reranked_docs(self, query: str, k: int):
+        query_embedding, candidates = self.vector_store.search_candidates(
+            query,
+            k=max(k, self.rerank_fetch_k),
+            fetch_k=max(k, self.rerank_fetch_k),
+            rrf_k=self.rrf_k,
+            hybrid=self.mode == "hybrid"
+        )
+        return self.reranker.rerank(query, query_embedding, candidates, k=k)
         
+    def retrieve_scored_docs(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Retrieve relevant documents with their distance scores (lower is closer)"""
+        if self.reranker is not None:
+            docs_and_scores = self._reranked_docs(query, k)
+        elif self.mode == "hybrid":
+            docs_and_scores = self.vector_store.hybrid_search_with_score(
+                query, k=k, fetch_k=max(k, self.fetch_k), rrf_k=self.rrf_k
+            )
+        else:
+            docs_and_scores = self.vector_store.similarity_search_with_score(query, k=k)
+        return [(doc.page_content, score) for doc, score in docs_and_scores]
+
+    async def aretrieve_scored_docs(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Async variant of retrieve_scored_docs"""
+        if self.reranker is not None:
+            docs_and_scores = await run_blocking(self._reranked_docs, query, k)
+        elif self.mode == "hybrid":
+            docs_and_scores = await self.vector_store.ahybrid_search_with_score(
+                query, k=k, fetch_k=max(k, self.fetch_k), rrf_k=self.rrf_k
+            )
+        else:
+            docs_and_scores = await self.vector_store.asimilarity_search_with_score(query, k=k)
+        return [(doc.page_content, score) for doc, score in docs_and_scores]
+
     def retrieve_relevant_docs(self, query: str, k: int = 3) -> List[str]:
         """Retrieve relevant documents from the vector store"""
-        docs_and_scores = self.vector_store.similarity_search_with_score(query, k=k)
-        return [doc.page_content for doc, score in docs_and_scores]
+        return [content for content, score in self.retrieve_scored_docs(query, k=k)]
+
+    async def aretrieve_relevant_docs(self, query: str, k: int = 3) -> List[str]:
+        """Async variant of retrieve_relevant_docs"""
+        return [content for content, score in await self.aretrieve_scored_docs(query, k=k)]
+
+class SearchError(RuntimeError):
+    """The search tool reported a failure instead of results"""
 
 class SearchAgent:
-    def __init__(self):
-        self.llm = get_llm()
-        self.tools = [
-            Tool(
-                name="Tavily Search",
-                description="Search the internet for current information",
-                func=TavilySearchResults().run
-            )
-        ]
-        
+    """Web search for supplementary information.
+
+    The default direct mode sends the query straight to the search tool and
+    caches formatted results per normalized query. The ReAct agent, which
+    costs extra LLM turns per lookup, is only built and used when agentic
+    mode is requested. Any tool or runnable with invoke/ainvoke can stand in
+    for Tavily as `search_tool`.
+    """
+    def __init__(self, mode: str = None, search_tool=None, cache_ttl: float = None):
+        self.mode = mode or os.getenv("SEARCH_MODE", "direct")
+        if self.mode not in ("direct", "agentic"):
+            raise ValueError(f"Unknown search mode: {self.mode}")
+        self.search_tool = search_tool or TavilySearchResults(
+            max_results=int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+        )
+        self.cache = LRUTTLCache(
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+            ttl=cache_ttl or float(os.getenv("SEARCH_CACHE_TTL", "900"))
+        )
+        self._agent_executor = None
+
         self.prompt = PromptTemplate.from_template(
             """You are a search agent that helps find additional information from the internet.
             Use the Tavily search tool when you need to find current or supplementary information.
@@ -57,19 +178,75 @@ class SearchAgent:
             Think about what specific information you need to search for, then use the search tool accordingly.
             """
         )
-        
-        self.agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=self.prompt
-        )
-        
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=self.tools,
-            verbose=True
-        )
 
-    def search(self, query: str) -> str:
-        """Perform an internet search using Tavily"""
-        return self.agent_executor.invoke({"question": query})["output"]
\ No newline at end of file
+    @property
+    def agent_executor(self) -> AgentExecutor:
+        if self._agent_executor is None:
+            tools = [
+                Tool(
+                    name="Tavily Search",
+                    description="Search the internet for current information",
+                    func=self.search_tool.run
+                )
+            ]
+            agent = create_react_agent(
+                llm=get_llm(),
+                tools=tools,
+                prompt=self.prompt
+            )
+            self._agent_executor = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                verbose=os.getenv("SEARCH_AGENT_VERBOSE", "false").lower() == "true"
+            )
+        return self._agent_executor
+
+    def _use_agent(self, agentic: bool = None) -> bool:
+        return self.mode == "agentic" if agentic is None else agentic
+
+    @staticmethod
+    def _format_results(results: Any) -> str:
+        """Render Tavily-style [{"url", "content"}] results as one paragraph per hit"""
+        if isinstance(results, str):
+            return results
+        snippets = []
+        for result in results or []:
+            if isinstance(result, dict):
+                source = f" (source: {result['url']})" if result.get("url") else ""
+                snippets.append(f"{result.get('content', '')}{source}")
+            else:
+                snippets.append(str(result))
+        return "\n\n".join(snippets)
+
+    @staticmethod
+    def _check_results(results: Any) -> Any:
+        # Tavily reports failures (rate limits, timeouts) as a repr string
+        # instead of raising; that text must not reach the prompt or the cache
+        if not isinstance(results, list):
+            raise SearchError(str(results))
+        return results
+
+    def search(self, query: str, agentic: bool = None) -> str:
+        """Perform an internet search using Tavily; raises SearchError if the tool reports a failure"""
+        if self._use_agent(agentic):
+            return self.agent_executor.invoke({"question": query})["output"]
+
+        key = normalize_query(query)
+        results = self.cache.get(key)
+        if results is None:
+            results = self._format_results(self._check_results(self.search_tool.invoke(query)))
+            self.cache.set(key, results)
+        return results
+
+    async def asearch(self, query: str, agentic: bool = None) -> str:
+        """Async variant of search"""
+        if self._use_agent(agentic):
+            result = await self.agent_executor.ainvoke({"question": query})
+            return result["output"]
+
+        key = normalize_query(query)
+        results = self.cache.get(key)
+        if results is None:
+            results = self._format_results(self._check_results(await self.search_tool.ainvoke(query)))
+            self.cache.set(key, results)
+        return results
\ No newline at end of file
@@ -1,21 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional
+from collections import deque
+from records import InteractionRecord
+import os
 
 class BaseAgent(ABC):
-    def __init__(self, name: str):
+    def __init__(self, name: str, history_limit: Optional[int] = None):
         self.name = name
         self.state = {}
-        self.conversation_history = []
+        # Ring buffer: the oldest interactions are dropped once the cap is hit
+        self.conversation_history = deque(
+            maxlen=history_limit or int(os.getenv("AGENT_HISTORY_LIMIT", "1000"))
+        )
     
     def log_interaction(self, action: str, data: Dict[str, Any]):
-        timestamp = datetime.utcnow()
-        log_entry = {
-            "agent": self.name,
-            "timestamp": timestamp,
-            "action": action,
-            "data": data
-        }
+        log_entry = InteractionRecord(self.name, action, data)
         self.conversation_history.append(log_entry)
         return log_entry
     
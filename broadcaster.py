@@ -0,0 +1,181 @@
+from typing import Dict, Any, Optional, Iterable, Set
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import WebSocket
+import asyncio
+import itertools
+import json
+import os
+
+class Subscriber:
+    """One connected client: its topic filter and a bounded queue of pending messages.
+
+    Messages are queued under a key. A message published with a coalesce key
+    replaces the pending message with the same key, so a slow client only
+    sees the latest state. When the queue is full the oldest message is
+    dropped. A sender task drains the queue to the socket.
+    """
+    def __init__(self, websocket: WebSocket, max_queue: int, send_timeout: float):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.agents: Optional[Set[str]] = None
+        self.workflows: Optional[Set[str]] = None
+        self.pending: "OrderedDict[Any, str]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def set_filter(self, agents: Optional[Iterable[str]] = None, workflows: Optional[Iterable[str]] = None):
+        """None means no filtering on that topic"""
+        self.agents = set(agents) if agents is not None else None
+        self.workflows = set(workflows) if workflows is not None else None
+
+    def matches(self, topics: Dict[str, Optional[str]]) -> bool:
+        # A set filter applies to every message: one without that topic
+        # (a status-only update, a snapshot) doesn't match it either
+        if self.agents is not None and topics.get("agent") not in self.agents:
+            return False
+        if self.workflows is not None and topics.get("workflow") not in self.workflows:
+            return False
+        return True
+
+    def enqueue(self, key: Any, payload: str):
+        if key in self.pending:
+            self.pending[key] = payload
+            self.pending.move_to_end(key)
+            self.coalesced += 1
+        else:
+            self.pending[key] = payload
+            if len(self.pending) > self.max_queue:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+        self.ready.set()
+
+    async def run(self):
+        """Send queued messages until the socket fails or the subscriber is closed"""
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending and not self.closed:
+                    _, payload = self.pending.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+                    self.sent += 1
+        except asyncio.TimeoutError:
+            # Too slow to keep up: close the socket so the client sees the
+            # eviction and its receive loop ends, instead of hanging open
+            self.closed = True
+            try:
+                await asyncio.wait_for(self.websocket.close(code=1013), self.send_timeout)
+            except Exception:
+                pass
+            raise
+
+class Broadcaster:
+    """Non-blocking pub/sub fan-out of JSON messages to WebSocket clients.
+
+    `publish` serializes a message once and only enqueues it for each
+    matching subscriber, so publishers never wait on a socket. Each
+    subscriber has its own sender task; one that errors is pruned
+    automatically, and one whose send times out also has its socket closed.
+    """
+    def __init__(self, max_queue: Optional[int] = None, send_timeout: Optional[float] = None):
+        self.max_queue = max_queue or int(os.getenv("BROADCAST_QUEUE_SIZE", "100"))
+        self.send_timeout = send_timeout or float(os.getenv("BROADCAST_SEND_TIMEOUT", "5"))
+        self.subscribers: Dict[int, Subscriber] = {}
+        self._sequence = itertools.count()
+        self.published = 0
+        self.pruned = 0
+
+    def subscribe(
+        self,
+        websocket: WebSocket,
+        agents: Optional[Iterable[str]] = None,
+        workflows: Optional[Iterable[str]] = None
+    ) -> Subscriber:
+        subscriber = Subscriber(websocket, self.max_queue, self.send_timeout)
+        subscriber.set_filter(agents, workflows)
+        self.subscribers[id(subscriber)] = subscriber
+        subscriber.task = asyncio.ensure_future(subscriber.run())
+        subscriber.task.add_done_callback(lambda _, subscriber=subscriber: self._prune(subscriber))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.closed = True
+        subscriber.ready.set()
+        self.subscribers.pop(id(subscriber), None)
+
+    def _prune(self, subscriber: Subscriber):
+        if self.subscribers.pop(id(subscriber), None) is not None:
+            self.pruned += 1
+        subscriber.closed = True
+        if subscriber.task is not None and not subscriber.task.cancelled():
+            # A failed send is expected for a dead socket; don't log it as unhandled
+            subscriber.task.exception()
+
+    def publish(
+        self,
+        message: Dict[str, Any],
+        agent: Optional[str] = None,
+        workflow: Optional[str] = None,
+        coalesce_key: Optional[str] = None
+    ) -> int:
+        """Queue a message for every matching subscriber; returns how many matched"""
+        topics = {"agent": agent, "workflow": workflow}
+        targets = [s for s in self.subscribers.values() if not s.closed and s.matches(topics)]
+        self.published += 1
+        if not targets:
+            return 0
+
+        payload = json.dumps(message, default=str)
+        key = coalesce_key if coalesce_key is not None else next(self._sequence)
+        for subscriber in targets:
+            subscriber.enqueue(key, payload)
+        return len(targets)
+
+    def send(self, subscriber: Subscriber, message: Dict[str, Any], coalesce_key: Optional[str] = None):
+        """Queue a message for one subscriber only, e.g. a reply to its request"""
+        key = coalesce_key if coalesce_key is not None else next(self._sequence)
+        subscriber.enqueue(key, json.dumps(message, default=str))
+
+    async def serve(self, websocket: WebSocket, on_message=None):
+        """Accept a client and handle its subscription messages until it disconnects.
+
+        Clients send {"type": "subscribe", "agents": [...], "workflows": [...]}
+        to filter, or {"type": "subscribe_all"} to receive everything. Every
+        message, after any filter change, is then passed to
+        `on_message(subscriber, data)`.
+        """
+        await websocket.accept()
+        subscriber = self.subscribe(websocket)
+        try:
+            while not subscriber.closed:
+                data = await websocket.receive_json()
+                message_type = data.get("type")
+                if message_type == "subscribe":
+                    subscriber.set_filter(data.get("agents"), data.get("workflows"))
+                elif message_type == "subscribe_all":
+                    subscriber.set_filter()
+                if on_message is not None:
+                    await on_message(subscriber, data)
+        except Exception:
+            # Disconnects surface here as WebSocketDisconnect or a closed-socket error
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = list(self.subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "pruned": self.pruned,
+            "queued": sum(len(s.pending) for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "timestamp": datetime.utcnow().isoformat()
+        }
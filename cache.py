@@ -0,0 +1,195 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query used as a cache key"""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", query.strip().lower()))
+
+class LRUTTLCache:
+    """Thread-safe mapping with least-recently-used eviction and per-entry expiry"""
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def touch(self, key: str):
+        """Mark an entry as recently used without counting a lookup"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of the unexpired entries"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value) for key, (expires_at, value) in self._entries.items()
+                if expires_at >= now
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+class ResponseCache:
+    """Cache of final responses keyed by normalized query text.
+
+    The exact tier matches normalized text. The optional semantic tier
+    compares the query embedding against those of cached queries and serves
+    a hit when the cosine distance is within `max_distance`.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, max_distance: float = 0.0):
+        self.exact = LRUTTLCache(max_entries=max_entries, ttl=ttl)
+        self.max_distance = max_distance
+        self.semantic_hits = 0
+        self.invalidations = 0
+        # Bumped by invalidate(); in-flight queries compare it before caching
+        self.generation = 0
+        self.stale_skips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.max_distance > 0
+
+    def get(self, query: str, embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Return a cached response for the query, or None on a miss"""
+        response = self.get_exact(query)
+        if response is None and embedding is not None:
+            response = self.get_similar(embedding)
+        return response
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """Exact tier only, so callers can skip embedding the query on a hit"""
+        entry = self.exact.get(normalize_query(query))
+        return entry["response"] if entry is not None else None
+
+    def get_similar(self, embedding: List[float]) -> Optional[str]:
+        """Semantic tier only"""
+        if not self.semantic_enabled:
+            return None
+        match = self._nearest(embedding)
+        if match is None:
+            return None
+        # Promote the neighbour so repeated paraphrases stay hot
+        key, entry = match
+        self.exact.touch(key)
+        self.semantic_hits += 1
+        return entry["response"]
+
+    def set(
+        self,
+        query: str,
+        response: str,
+        embedding: Optional[List[float]] = None,
+        generation: Optional[int] = None
+    ):
+        """Cache a response; pass the `generation` read before the lookup so an
+        answer built before an invalidation is not stored afterwards"""
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_skips += 1
+                return
+            self.exact.set(normalize_query(query), {"response": response, "embedding": vector})
+
+    def _nearest(self, embedding: List[float]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        candidates = [
+            (key, value) for key, value in self.exact.items()
+            if value["embedding"] is not None
+        ]
+        if not candidates:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        matrix = np.stack([value["embedding"] for _, value in candidates])
+        distances = 1.0 - matrix @ (query / norm)
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None
+        return candidates[best]
+
+    def invalidate(self):
+        """Drop every cached response, e.g. after the document corpus changed"""
+        with self._lock:
+            self.generation += 1
+            self.exact.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.exact.stats()
+        # Semantic hits are first counted as exact-tier misses
+        stats["misses"] -= self.semantic_hits
+        stats["exact_hits"] = stats["hits"]
+        stats["semantic_hits"] = self.semantic_hits
+        stats["hits"] += self.semantic_hits
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["invalidations"] = self.invalidations
+        stats["stale_skips"] = self.stale_skips
+        return stats
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        max_distance=float(os.getenv("RESPONSE_CACHE_SEMANTIC_DISTANCE", "0"))
+    )
\ No newline at end of file
@@ -0,0 +1,149 @@
+from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+class CheckpointStore:
+    """SQLite-backed checkpoints of workflow state, one row per workflow.
+
+    Each row is overwritten after every completed step. Rows are tagged with
+    the writing process's `owner` token and a heartbeat time, refreshed by
+    `heartbeat` while a step runs, so another process can tell an abandoned
+    run from one that is still in flight. Taking over an abandoned row goes
+    through `claim`, which only one process can win, and a process that has
+    lost its row can no longer overwrite it.
+    """
+    def __init__(self, path: str = "workflow_checkpoints.db"):
+        self.path = path
+        self.owner = uuid.uuid4().hex
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    workflow_id TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    steps INTEGER NOT NULL,
+                    owner TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_checkpoints_fingerprint "
+                "ON checkpoints (fingerprint, updated_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call keeps the store safe to use from executor threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, checkpoint: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO checkpoints (workflow_id, fingerprint, status, steps, owner, updated_at, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(workflow_id) DO UPDATE SET
+                    status = excluded.status,
+                    steps = excluded.steps,
+                    owner = excluded.owner,
+                    updated_at = excluded.updated_at,
+                    payload = excluded.payload
+                WHERE checkpoints.owner = excluded.owner
+                """,
+                (
+                    checkpoint["workflow_id"],
+                    checkpoint["fingerprint"],
+                    checkpoint["status"],
+                    len(checkpoint["steps"]),
+                    self.owner,
+                    time.time(),
+                    json.dumps(checkpoint, default=str)
+                )
+            )
+
+    def _row_to_checkpoint(self, row) -> Dict[str, Any]:
+        checkpoint = json.loads(row[0])
+        checkpoint["owner"] = row[1]
+        checkpoint["updated_at"] = row[2]
+        return checkpoint
+
+    def load(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, owner, updated_at FROM checkpoints WHERE workflow_id = ?",
+                (workflow_id,)
+            ).fetchone()
+        return self._row_to_checkpoint(row) if row else None
+
+    def find_by_fingerprint(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Most recently updated checkpoint for an identical workflow input"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, owner, updated_at FROM checkpoints "
+                "WHERE fingerprint = ? ORDER BY updated_at DESC LIMIT 1",
+                (fingerprint,)
+            ).fetchone()
+        return self._row_to_checkpoint(row) if row else None
+
+    def is_abandoned(self, checkpoint: Dict[str, Any], stale_after: float) -> bool:
+        """A running checkpoint written by another process that has stopped updating it"""
+        return (
+            checkpoint["status"] == "running"
+            and checkpoint["owner"] != self.owner
+            and time.time() - checkpoint["updated_at"] > stale_after
+        )
+
+    def heartbeat(self, workflow_id: str) -> bool:
+        """Mark a running checkpoint this process owns as still in flight"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE checkpoints SET updated_at = ? "
+                "WHERE workflow_id = ? AND owner = ? AND status = 'running'",
+                (time.time(), workflow_id, self.owner)
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, checkpoint: Dict[str, Any]) -> bool:
+        """Take ownership of a checkpoint as it was read; False if anyone touched it since"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE checkpoints SET owner = ?, updated_at = ? "
+                "WHERE workflow_id = ? AND owner = ? AND updated_at = ? AND status = 'running'",
+                (
+                    self.owner,
+                    time.time(),
+                    checkpoint["workflow_id"],
+                    checkpoint["owner"],
+                    checkpoint["updated_at"]
+                )
+            )
+        return cursor.rowcount == 1
+
+    def list_resumable(self, stale_after: float) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT workflow_id FROM checkpoints "
+                "WHERE status = 'running' AND owner != ? AND updated_at < ?",
+                (self.owner, time.time() - stale_after)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, workflow_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE workflow_id = ?", (workflow_id,))
\ No newline at end of file
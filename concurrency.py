@@ -0,0 +1,28 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared, bounded thread pool for blocking calls made from async code"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "16")),
+                    thread_name_prefix="rag-blocking"
+                )
+    return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the shared pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
\ No newline at end of file
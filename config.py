@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from datetime import datetime
+from typing import Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "RAG System API"
@@ -8,7 +9,11 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str
     TAVILY_API_KEY: str
     COLLECTION_NAME: str = "default_collection"
+    CHROMA_PERSIST_DIR: Optional[str] = None
     DEFAULT_USER: str = "system"
+    EMBED_BATCH_SIZE: int = 64
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,160 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n|\n(?=\s*[-*\d])")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Llama-family tokenizers)"""
+    return (len(text) + 3) // 4
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + " ..."
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class ContextBuilder:
+    """Assemble the generation prompt under a token budget.
+
+    Each source (parsed query, retrieved documents, web results) gets its own
+    budget. Documents are taken best score first, web snippets that repeat a
+    selected document are dropped, and any budget a source leaves unused
+    carries over to the next one.
+    """
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        parsed_query_tokens: int = 200,
+        document_tokens: int = 1800,
+        web_tokens: int = 1000,
+        duplicate_threshold: float = 0.6,
+        min_fragment_tokens: int = 50
+    ):
+        self.max_tokens = max_tokens
+        self.parsed_query_tokens = parsed_query_tokens
+        self.document_tokens = document_tokens
+        self.web_tokens = web_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_fragment_tokens = min_fragment_tokens
+
+    def _is_duplicate(self, shingles: Set[Tuple[str, ...]], seen: List[Set[Tuple[str, ...]]]) -> bool:
+        # Containment rather than Jaccard, so a short snippet quoted inside a
+        # long chunk still counts as a duplicate
+        if not shingles:
+            return True
+        for other in seen:
+            if other and len(shingles & other) / min(len(shingles), len(other)) >= self.duplicate_threshold:
+                return True
+        return False
+
+    def _select(
+        self,
+        texts: Sequence[str],
+        budget: int,
+        seen: List[Set[Tuple[str, ...]]],
+        stats: Dict[str, Any],
+        source: str
+    ) -> Tuple[List[str], int]:
+        selected = []
+        for text in texts:
+            text = text.strip()
+            if not text:
+                continue
+            shingles = _shingles(text)
+            if self._is_duplicate(shingles, seen):
+                stats[f"{source}_duplicates"] += 1
+                continue
+            tokens = estimate_tokens(text)
+            if tokens > budget:
+                if budget < self.min_fragment_tokens:
+                    stats[f"{source}_dropped"] += 1
+                    continue
+                text = _truncate(text, budget)
+                tokens = estimate_tokens(text)
+                stats["truncated"] = True
+            selected.append(text)
+            seen.append(shingles)
+            budget -= tokens
+        return selected, budget
+
+    def build(
+        self,
+        query: str,
+        parsed_query: Any,
+        documents: Sequence[str],
+        scores: Optional[Sequence[float]] = None,
+        search_results: str = ""
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Return the prompt and its context statistics, including prompt_tokens"""
+        stats: Dict[str, Any] = {
+            "documents_used": 0,
+            "documents_duplicates": 0,
+            "documents_dropped": 0,
+            "web_used": 0,
+            "web_duplicates": 0,
+            "web_dropped": 0,
+            "truncated": False
+        }
+
+        if isinstance(parsed_query, dict):
+            parsed_query = parsed_query.get("parsed_query", parsed_query)
+        parsed_text = _truncate(str(parsed_query or ""), self.parsed_query_tokens)
+        carry = self.parsed_query_tokens - estimate_tokens(parsed_text)
+
+        # Chroma scores are distances, so lower is more relevant
+        if scores is not None and len(scores) == len(documents):
+            documents = [doc for _, doc in sorted(zip(scores, documents), key=lambda pair: pair[0])]
+
+        seen: List[Set[Tuple[str, ...]]] = []
+        doc_budget = min(self.document_tokens + carry, self.max_tokens - estimate_tokens(parsed_text))
+        selected_docs, remaining = self._select(documents, doc_budget, seen, stats, "documents")
+
+        web_budget = min(
+            self.web_tokens + remaining,
+            self.max_tokens - estimate_tokens(parsed_text) - (doc_budget - remaining)
+        )
+        snippets = _PARAGRAPH_SPLIT.split(search_results or "")
+        selected_web, _ = self._select(snippets, web_budget, seen, stats, "web")
+
+        stats["documents_used"] = len(selected_docs)
+        stats["web_used"] = len(selected_web)
+
+        documents_block = "\n\n".join(
+            f"[{i}] {doc}" for i, doc in enumerate(selected_docs, 1)
+        ) or "None"
+        web_block = "\n\n".join(selected_web) or "None"
+
+        prompt = f"""
+            Based on the following information, provide a comprehensive response:
+
+            Original Query: {query}
+            Parsed Query: {parsed_text}
+            Retrieved Documents:
+{documents_block}
+            Web Search Results:
+{web_block}
+            """
+        stats["prompt_tokens"] = estimate_tokens(prompt)
+        return prompt, stats
+
+@lru_cache()
+def get_context_builder() -> ContextBuilder:
+    return ContextBuilder(
+        max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "3000")),
+        parsed_query_tokens=int(os.getenv("CONTEXT_PARSED_QUERY_TOKENS", "200")),
+        document_tokens=int(os.getenv("CONTEXT_DOCUMENT_TOKENS", "1800")),
+        web_tokens=int(os.getenv("CONTEXT_WEB_TOKENS", "1000"))
+    )
\ No newline at end of file
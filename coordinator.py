@@ -1,34 +1,47 @@
-from typing import Dict, Any, List
-from .base_agent import BaseAgent
-from fastapi import WebSocket
+from typing import Dict, Any, List, Union, Optional
+from datetime import datetime
+from base_agent import BaseAgent
+from broadcaster import Broadcaster
 import asyncio
-import json
 
 class AgentCoordinator:
-    def __init__(self):
+    """Runs named workflows over registered agents.
+
+    A workflow entry that is a list of agent names is a parallel group: the
+    agents receive the same input snapshot, run concurrently (bounded by
+    `max_concurrency`), and their results are merged in listed order.
+
+    Agent updates are published through a `Broadcaster`, so a slow or dead
+    monitoring client never holds up a workflow step.
+    """
+    def __init__(self, max_concurrency: int = 4, broadcaster: Optional[Broadcaster] = None):
         self.agents: Dict[str, BaseAgent] = {}
-        self.active_workflows: Dict[str, List[str]] = {
+        self.concurrency_limit = asyncio.Semaphore(max_concurrency)
+        self.active_workflows: Dict[str, List[Union[str, List[str]]]] = {
             "query_processing": ["parser", "search", "retrieval"],
             "document_ingestion": ["validator", "processor", "indexer"]
         }
-        self.websocket_connections: List[WebSocket] = []
+        self.broadcaster = broadcaster or Broadcaster()
     
     def register_agent(self, agent: BaseAgent):
         self.agents[agent.name] = agent
     
-    async def broadcast_agent_update(self, agent_name: str, update: Dict[str, Any]):
-        """Broadcast agent state updates to all connected clients"""
+    async def broadcast_agent_update(self, agent_name: str, update: Dict[str, Any], workflow_name: Optional[str] = None):
+        """Broadcast agent state updates to subscribed clients without waiting on them"""
         message = {
             "type": "agent_update",
             "agent": agent_name,
+            "workflow": workflow_name,
             "data": update,
             "timestamp": datetime.utcnow().isoformat()
         }
-        for ws in self.websocket_connections:
-            try:
-                await ws.send_json(message)
-            except:
-                continue
+        # A client that falls behind only gets the latest update per agent
+        self.broadcaster.publish(
+            message,
+            agent=agent_name,
+            workflow=workflow_name,
+            coalesce_key=f"agent_update:{workflow_name}:{agent_name}"
+        )
 
     async def execute_workflow(self, 
                              workflow_name: str, 
@@ -40,25 +53,31 @@ class AgentCoordinator:
         workflow_results = []
         current_data = initial_data
         
-        for agent_name in self.active_workflows[workflow_name]:
-            if agent_name not in self.agents:
+        for entry in self.active_workflows[workflow_name]:
+            group = entry if isinstance(entry, list) else [entry]
+            agent_names = [agent_name for agent_name in group if agent_name in self.agents]
+            if not agent_names:
                 continue
-                
-            agent = self.agents[agent_name]
-            
-            # Process with current agent
-            result = await agent.process(current_data)
-            
-            # Broadcast update
-            await self.broadcast_agent_update(agent_name, result)
-            
-            workflow_results.append({
-                "agent": agent_name,
-                "result": result
-            })
-            
-            # Update data for next agent
-            current_data.update(result)
+
+            snapshot = dict(current_data)
+
+            async def run(agent_name: str) -> Dict[str, Any]:
+                async with self.concurrency_limit:
+                    result = await self.agents[agent_name].process(dict(snapshot))
+                # Broadcast update
+                await self.broadcast_agent_update(agent_name, result, workflow_name)
+                return result
+
+            # Process the group; a single agent is a group of one
+            results = await asyncio.gather(*(run(agent_name) for agent_name in agent_names))
+
+            # Update data for next agent, in listed rather than completion order
+            for agent_name, result in zip(agent_names, results):
+                workflow_results.append({
+                    "agent": agent_name,
+                    "result": result
+                })
+                current_data.update(result)
         
         return {
             "workflow": workflow_name,
@@ -3,24 +3,66 @@ from Config.llm import llm
 from Graph.Agent.document_agent import DocumentInsertionAgent
 from Graph.Tool.Tools import SearchEngine, VectorSearch
 from Graph.Memory.memory import short_term_memory_store, load_and_save_long_term
-from .config import get_settings, Settings
+from config import get_settings, Settings
+from rag_system import AgenticRAGSystem
+from vector_store import ChromaVectorStore
+from ingestion import BulkIngestor
+from concurrency import run_blocking
+from cache import get_response_cache, normalize_query
+from singleflight import get_single_flight
+from typing import Dict, List, Tuple, Any
+from datetime import datetime
+from functools import lru_cache
+import json
 import time
 
+@lru_cache()
+def get_vector_store() -> ChromaVectorStore:
+    """The one collection client shared by querying and every ingestion path"""
+    settings = get_settings()
+    return ChromaVectorStore(settings.COLLECTION_NAME, persist_directory=settings.CHROMA_PERSIST_DIR)
+
+@lru_cache()
+def get_ingestor() -> BulkIngestor:
+    settings = get_settings()
+    return BulkIngestor(
+        get_vector_store(),
+        batch_size=settings.EMBED_BATCH_SIZE,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP
+    )
+
 class RAGSystem:
     def __init__(self, settings: Settings = Depends(get_settings)):
         self.settings = settings
         self.doc_agent = DocumentInsertionAgent()
         self.agents = self._initialize_agents()
+        # Inserts go through the same store as queries, so the dense index
+        # and its BM25 index stay in sync
+        self.query_engine = AgenticRAGSystem(vector_store=get_vector_store())
+        self.ingestor = get_ingestor()
         
     def _initialize_agents(self):
         from main import create_agents
         return create_agents()
+
+    def _process_query(self, query: str, context: Dict = None):
+        return self.query_engine.process_query(query)
+
+    async def _aprocess_query(self, query: str, context: Dict = None):
+        return await self.query_engine.aprocess_query(query)
     
     async def process_query(self, query: str, context: Dict = None):
         start_time = time.time()
         
         try:
-            result = self._process_query(query, context)
+            # Concurrent identical queries share one pipeline run
+            result = await get_single_flight().do(
+                f"rag:{normalize_query(query)}",
+                self._aprocess_query,
+                query,
+                context
+            )
             
             processing_time = time.time() - start_time
             
@@ -36,24 +78,41 @@ class RAGSystem:
                 detail=f"Error processing query: {str(e)}"
             )
     
+    async def stream_query(self, query: str, context: Dict = None):
+        """Yield query progress and response tokens as Server-Sent Events"""
+        try:
+            async for event in self.query_engine.astream_query(query):
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+        except Exception as e:
+            payload = {"event": "error", "detail": f"Error processing query: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(payload)}\n\n"
+
     async def insert_document(self, content: str, metadata: Dict = None):
         try:
-            result = self.doc_agent.insert_document(content, metadata)
-            
-            return {
-                "document_id": result["insertion_result"]["document_ids"][0],
-                "status": result["insertion_result"]["status"],
-                "message": result["insertion_result"]["message"],
-                "chunks_created": len(result["insertion_result"]["document_ids"]),
-                "metadata": metadata,
-                "timestamp": datetime.utcnow()
-            }
+            result = await run_blocking(self.ingestor.ingest, [(content, metadata)])
+            get_response_cache().invalidate()
+            document = result["documents"][0]
+            if document["status"] != "success":
+                raise RuntimeError(document["message"])
+            return document
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error inserting document: {str(e)}"
             )
 
+    async def insert_documents(self, documents: List[Tuple[str, Dict[str, Any]]]):
+        """Bulk insert (content, metadata) pairs with batched embedding"""
+        try:
+            result = await run_blocking(self.ingestor.ingest, documents)
+            get_response_cache().invalidate()
+            return result
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error inserting documents: {str(e)}"
+            )
+
 @lru_cache()
 def get_rag_system(settings: Settings = Depends(get_settings)):
     return RAGSystem(settings)
\ No newline at end of file
@@ -1,24 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
-from ..models import DocumentInput, DocumentResponse
+from ..models import DocumentInput, BatchDocumentResponse
 from ..dependencies import get_rag_system, RAGSystem
 from typing import List
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-@router.post("/batch", response_model=List[DocumentResponse])
+@router.post("/batch", response_model=BatchDocumentResponse)
 async def batch_insert_documents(
     documents: List[DocumentInput],
     rag_system: RAGSystem = Depends(get_rag_system)
 ):
-    """Insert multiple documents at once"""
-    responses = []
-    for doc in documents:
-        result = await rag_system.insert_document(
-            content=doc.content,
-            metadata=doc.metadata
-        )
-        responses.append(result)
-    return responses
+    """Insert multiple documents at once, embedding and upserting in batches"""
+    return await rag_system.insert_documents(
+        [(doc.content, doc.metadata) for doc in documents]
+    )
 
 @router.get("/status/{document_id}")
 async def get_document_status(
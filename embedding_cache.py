@@ -0,0 +1,221 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from cache import LRUTTLCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+class MmapVectorFile:
+    """Append-only on-disk store of float32 vectors, read through a memory map.
+
+    Vectors live in `vectors.f32` as fixed-width rows, and `keys.txt` holds
+    one content hash per row. Rows are only ever appended, so the map just
+    needs reopening when a lookup goes past the mapped length.
+
+    Several processes (e.g. uvicorn workers) may share the directory: appends
+    are serialized with an OS file lock, and each writer takes its row number
+    from the shared files under that lock, so keys and rows stay aligned.
+    Rows appended by other processes are picked up on a lookup miss. Where
+    `fcntl` is unavailable each process gets its own subdirectory instead.
+    """
+    def __init__(self, directory: str):
+        if fcntl is None:
+            directory = os.path.join(directory, f"pid-{os.getpid()}")
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.txt")
+        self.dim_path = os.path.join(directory, "dim")
+        self.lock_path = os.path.join(directory, "lock")
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._row_count = 0
+        self._keys_offset = 0
+        self._map: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+
+        with self._lock, self._file_lock():
+            self._read_dim()
+            if self.dim is not None:
+                self._refresh()
+                self._repair()
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_dim(self):
+        if self.dim is None and os.path.exists(self.dim_path):
+            with open(self.dim_path) as f:
+                self.dim = int(f.read().strip())
+
+    def _refresh(self):
+        """Index keys appended since the last read, by this or another process"""
+        if not os.path.exists(self.keys_path) or os.path.getsize(self.keys_path) <= self._keys_offset:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        # Only whole lines; a partial one is still being written
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self._rows.setdefault(line.decode().strip(), self._row_count)
+            self._row_count += 1
+        self._keys_offset += len(complete)
+
+    def _repair(self):
+        """Drop vector bytes past the last complete key (a write cut short); needs the file lock"""
+        row_bytes = 4 * self.dim
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size != self._row_count * row_bytes:
+            if size < self._row_count * row_bytes:
+                # Keys without vectors: rewrite keys.txt to the rows that exist
+                rows = size // row_bytes
+                with open(self.keys_path, "rb") as f:
+                    lines = f.read().splitlines(keepends=True)[:rows]
+                with open(self.keys_path, "wb") as f:
+                    f.writelines(lines)
+                self._rows = {}
+                self._row_count = 0
+                self._keys_offset = 0
+                self._refresh()
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(self._row_count * row_bytes)
+            self._map = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self._read_dim()
+                if self.dim is not None:
+                    self._refresh()
+                    row = self._rows.get(key)
+            if row is None:
+                return None
+            if self._map is None or row >= self._map.shape[0]:
+                self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+            return np.array(self._map[row])
+
+    def put(self, key: str, vector: List[float]):
+        data = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if key in self._rows:
+                return
+            with self._file_lock():
+                self._read_dim()
+                if self.dim is None:
+                    self.dim = data.shape[0]
+                    with open(self.dim_path, "w") as f:
+                        f.write(str(self.dim))
+                # Catch up with other writers so the row number is the shared one
+                self._refresh()
+                if key in self._rows:
+                    return
+                self._repair()
+                line = (key + "\n").encode()
+                # The vector goes first, so a key is never visible without its row
+                with open(self.vectors_path, "ab") as f:
+                    f.write(data.tobytes())
+                with open(self.keys_path, "ab") as f:
+                    f.write(line)
+                self._rows[key] = self._row_count
+                self._row_count += 1
+                self._keys_offset += len(line)
+
+class CachedEmbeddings(Embeddings):
+    """Content-hash keyed cache around an embeddings model.
+
+    Lookups go to an in-memory LRU first, then to the optional memory-mapped
+    disk store, and only the remaining misses reach the wrapped model, in a
+    single batched call.
+    """
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10000, cache_dir: Optional[str] = None):
+        self.embeddings = embeddings
+        self.namespace = getattr(embeddings, "model_name", type(embeddings).__name__)
+        self.memory = LRUTTLCache(max_entries=max_entries, ttl=float("inf"))
+        self.disk = MmapVectorFile(cache_dir) if cache_dir else None
+        self.disk_hits = 0
+        self.embedded = 0
+
+    def _key(self, kind: str, text: str) -> str:
+        # Query and document embeddings are keyed apart because some models
+        # add an instruction prefix to one side only
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                vector = stored.tolist()
+                self.memory.set(key, vector)
+                self.disk_hits += 1
+                return vector
+        return None
+
+    def _store(self, key: str, vector: List[float]):
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("document", text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self._lookup(key) for key in keys]
+
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            self.embedded += len(computed)
+            fresh = dict(zip(missing.keys(), computed))
+            for key, vector in fresh.items():
+                self._store(key, vector)
+            vectors = [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.embedded += 1
+            self._store(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        # Disk hits were first counted as memory misses
+        hits = memory["hits"] + self.disk_hits
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "memory_entries": memory["entries"],
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": memory["misses"] - self.disk_hits,
+            "embedded": self.embedded,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,130 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from vector_store import ChromaVectorStore
+
+class BulkIngestor:
+    """Chunk, embed and upsert many documents in a few large batches"""
+    def __init__(
+        self,
+        vector_store: ChromaVectorStore,
+        batch_size: int = 64,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200
+    ):
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+    def _chunk(self, content: str, metadata: Dict[str, Any]) -> Tuple[str, List[Document], List[str]]:
+        # Content-derived IDs make re-ingesting the same document an overwrite
+        document_id = hashlib.sha256(content.encode()).hexdigest()[:16]
+        chunks = self.text_splitter.split_text(content) or [content]
+        documents = [
+            Document(
+                page_content=chunk,
+                metadata={
+                    **self.vector_store.sanitize_metadata(metadata),
+                    "document_id": document_id,
+                    "chunk_index": i
+                }
+            )
+            for i, chunk in enumerate(chunks)
+        ]
+        ids = [f"{document_id}_{i}" for i in range(len(chunks))]
+        return document_id, documents, ids
+
+    def ingest(self, items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Ingest (content, metadata) pairs; returns per-document results and batch stats"""
+        start = time.perf_counter()
+        responses = []
+        pending: Dict[str, Document] = {}
+
+        for content, metadata in items:
+            metadata = metadata or {}
+            document_id, documents, ids = self._chunk(content, metadata)
+            pending.update(zip(ids, documents))
+            responses.append({
+                "document_id": document_id,
+                "status": "success",
+                "message": f"Queued {len(documents)} chunks",
+                "chunks_created": len(documents),
+                "metadata": metadata,
+                "timestamp": datetime.utcnow()
+            })
+
+        ids = list(pending.keys())
+        documents = list(pending.values())
+        embed_time = 0.0
+        upsert_time = 0.0
+        batches = 0
+        committed: Dict[str, List[str]] = {}
+        failures: Dict[str, str] = {}
+        failed_chunks: Dict[str, List[str]] = {}
+
+        for offset in range(0, len(documents), self.batch_size):
+            batch_ids = ids[offset:offset + self.batch_size]
+            batch_docs = documents[offset:offset + self.batch_size]
+            batches += 1
+            try:
+                embed_start = time.perf_counter()
+                embeddings = self.vector_store.embeddings.embed_documents(
+                    [doc.page_content for doc in batch_docs]
+                )
+                upsert_start = time.perf_counter()
+                self.vector_store.upsert_embeddings(batch_docs, embeddings, batch_ids)
+                embed_time += upsert_start - embed_start
+                upsert_time += time.perf_counter() - upsert_start
+                for chunk_id, doc in zip(batch_ids, batch_docs):
+                    committed.setdefault(doc.metadata["document_id"], []).append(chunk_id)
+            except Exception as e:
+                for chunk_id, doc in zip(batch_ids, batch_docs):
+                    failures.setdefault(doc.metadata["document_id"], str(e))
+                    failed_chunks.setdefault(doc.metadata["document_id"], []).append(chunk_id)
+
+        # A document whose chunks span several batches may be half written:
+        # roll back the batches that did land so it is all or nothing
+        rollback_errors: Dict[str, str] = {}
+        for document_id in failures:
+            if committed.get(document_id):
+                try:
+                    self.vector_store.delete(committed[document_id])
+                except Exception as e:
+                    rollback_errors[document_id] = str(e)
+
+        for response in responses:
+            document_id = response["document_id"]
+            if document_id in rollback_errors:
+                response["status"] = "partial"
+                response["message"] = (
+                    f"Error inserting document: {failures[document_id]}; "
+                    f"rollback failed: {rollback_errors[document_id]}"
+                )
+                response["failed_chunk_ids"] = failed_chunks[document_id]
+            elif document_id in failures:
+                response["status"] = "error"
+                response["message"] = f"Error inserting document: {failures[document_id]}"
+            else:
+                response["message"] = f"Inserted {response['chunks_created']} chunks"
+
+        total_time = time.perf_counter() - start
+        return {
+            "documents": responses,
+            "stats": {
+                "documents": len(responses),
+                "chunks": len(documents),
+                "batches": batches,
+                "batch_size": self.batch_size,
+                "embed_seconds": embed_time,
+                "upsert_seconds": upsert_time,
+                "total_seconds": total_time,
+                "documents_per_second": len(responses) / total_time if total_time else 0.0,
+                "chunks_per_second": len(documents) / total_time if total_time else 0.0
+            }
+        }
\ No newline at end of file
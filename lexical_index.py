@@ -0,0 +1,147 @@
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._\-:/#][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound tokens such as IDs and error codes
+    ("ERR-1234", "v2.1.0") are kept whole and also split into their parts"""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART.findall(token))
+    return tokens
+
+class BM25Index:
+    """In-memory BM25 inverted index over chunk IDs.
+
+    Postings are two parallel `array("I")` per term (internal doc numbers and
+    term frequencies), so the index costs a few bytes per posting rather
+    than a Python object each. Replacing or removing a chunk tombstones its
+    old doc number; the postings are compacted once most entries are dead.
+    Document frequencies include tombstoned entries until then, which only
+    slightly skews IDF.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._doc_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._total_length = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """Index chunks, replacing any already indexed under the same ID"""
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self._positions:
+                    self._remove(doc_id)
+                position = len(self._doc_ids)
+                self._doc_ids.append(doc_id)
+                self._positions[doc_id] = position
+
+                frequencies: Dict[str, int] = {}
+                for term in tokenize(text):
+                    frequencies[term] = frequencies.get(term, 0) + 1
+                length = sum(frequencies.values())
+                self._lengths.append(length)
+                self._total_length += length
+
+                for term, frequency in frequencies.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array("I"), array("I"))
+                    postings[0].append(position)
+                    postings[1].append(frequency)
+            self._maybe_compact()
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self._positions:
+                    self._remove(doc_id)
+            self._maybe_compact()
+
+    def clear(self):
+        with self._lock:
+            self._doc_ids = []
+            self._positions = {}
+            self._lengths = array("I")
+            self._postings = {}
+            self._total_length = 0
+            self._dead = 0
+
+    def _remove(self, doc_id: str):
+        position = self._positions.pop(doc_id)
+        self._total_length -= self._lengths[position]
+        # A zero length marks the doc number as dead
+        self._lengths[position] = 0
+        self._dead += 1
+
+    def _maybe_compact(self):
+        if self._dead < 1000 or self._dead < len(self._positions):
+            return
+        remap = {}
+        doc_ids = []
+        lengths = array("I")
+        for doc_id, old in sorted(self._positions.items(), key=lambda item: item[1]):
+            remap[old] = len(doc_ids)
+            doc_ids.append(doc_id)
+            lengths.append(self._lengths[old])
+
+        postings = {}
+        for term, (docs, frequencies) in self._postings.items():
+            new_docs, new_frequencies = array("I"), array("I")
+            for old, frequency in zip(docs, frequencies):
+                if old in remap:
+                    new_docs.append(remap[old])
+                    new_frequencies.append(frequency)
+            if new_docs:
+                postings[term] = (new_docs, new_frequencies)
+
+        self._doc_ids = doc_ids
+        self._positions = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+        self._lengths = lengths
+        self._postings = postings
+        self._dead = 0
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (chunk ID, BM25 score) pairs, best first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            live = len(self._positions)
+            if not terms or not live:
+                return []
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float64)
+            average_length = self._total_length / live or 1.0
+            norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+            scores = np.zeros(len(self._doc_ids))
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings[0], dtype=np.uint32)
+                frequencies = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float64)
+                idf = np.log(1 + (live - len(docs) + 0.5) / (len(docs) + 0.5))
+                # Each doc appears at most once per term, so plain fancy-index add is safe
+                scores[docs] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[docs])
+
+            scores[lengths == 0] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._doc_ids[position], float(scores[position])) for position in ranked]
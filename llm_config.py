@@ -1,13 +1,68 @@
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from typing import Dict, Tuple
+import httpx
 import os
+import threading
 
 load_dotenv()
 
-def get_llm(temperature=0):
-    """Initialize Groq LLM with llama-3.1-8b-instant"""
-    return ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=temperature,
-        groq_api_key=os.getenv("GROQ_API_KEY")
-    )
\ No newline at end of file
+DEFAULT_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+_clients: Dict[Tuple[str, float], ChatGroq] = {}
+_http_client = None
+_http_async_client = None
+_lock = threading.Lock()
+
+def _pool_limits() -> httpx.Limits:
+    # max_connections caps in-flight requests: extra calls wait for a free
+    # connection in the pool instead of opening new ones
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "16")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    )
+
+def _pool_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("LLM_REQUEST_TIMEOUT", "60")),
+        pool=float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+    )
+
+def _get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Process-wide keep-alive transports shared by every ChatGroq instance"""
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_pool_limits(), timeout=_pool_timeout())
+        _http_async_client = httpx.AsyncClient(limits=_pool_limits(), timeout=_pool_timeout())
+    return _http_client, _http_async_client
+
+def get_llm(temperature=0, model: str = DEFAULT_MODEL):
+    """Return the shared Groq LLM for (model, temperature), creating it on first use"""
+    key = (model, float(temperature))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        if key not in _clients:
+            http_client, http_async_client = _get_http_clients()
+            _clients[key] = ChatGroq(
+                model=model,
+                temperature=temperature,
+                groq_api_key=os.getenv("GROQ_API_KEY"),
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+        return _clients[key]
+
+async def close_llm_clients():
+    """Close the pooled transports, e.g. on application shutdown"""
+    global _http_client, _http_async_client
+    with _lock:
+        _clients.clear()
+        http_client, http_async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+    if http_client is not None:
+        http_client.close()
+        await http_async_client.aclose()
\ No newline at end of file
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
-from Graph.Tool.Tools import SearchEngine, VectorSearch, VectorStore
+from Graph.Tool.Tools import SearchEngine, VectorSearch
+from llm_config import close_llm_clients
+from cache import get_response_cache, normalize_query
+from singleflight import get_single_flight
+from supervisor_agent import get_supervisor
+from dependencies import get_ingestor
+from concurrency import run_blocking
+import asyncio
 
 app = FastAPI()
 
@@ -16,6 +23,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_snapshot_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def startup():
+    """Start periodic supervisor snapshots for /ws/supervisor subscribers"""
+    global _snapshot_task
+    _snapshot_task = asyncio.create_task(get_supervisor().publish_snapshots())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled LLM connections"""
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+    await close_llm_clients()
+
 class QueryRequest(BaseModel):
     query: str
     search_type: Optional[str] = "both"
@@ -42,19 +64,40 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters"""
+    return {
+        "status": "success",
+        "timestamp": datetime.utcnow().isoformat(),
+        "response_cache": get_response_cache().stats(),
+        "coalescing": get_single_flight().stats()
+    }
+
+async def _run_search(query: str, search_type: str) -> Dict[str, Any]:
+    results = {}
+    
+    if search_type in ["web", "both"]:
+        web_results = await SearchEngine.arun(query=query)
+        results["web_search"] = web_results
+    
+    if search_type in ["vector", "both"]:
+        vector_results = await VectorSearch.arun(query=query)
+        results["vector_search"] = vector_results
+    
+    return results
+
 @app.post("/api/search")
 async def search(request: QueryRequest):
     """Search endpoint"""
     try:
-        results = {}
-        
-        if request.search_type in ["web", "both"]:
-            web_results = await SearchEngine.arun(query=request.query)
-            results["web_search"] = web_results
-        
-        if request.search_type in ["vector", "both"]:
-            vector_results = await VectorSearch.arun(query=request.query)
-            results["vector_search"] = vector_results
+        # Concurrent identical searches share one execution
+        results = await get_single_flight().do(
+            f"search:{request.search_type}:{normalize_query(request.query)}",
+            _run_search,
+            request.query,
+            request.search_type
+        )
         
         return {
             "status": "success",
@@ -64,14 +107,40 @@ async def search(request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/workflow")
+async def run_workflow(request: QueryRequest):
+    """Run a query through the supervisor; progress streams on /ws/supervisor"""
+    tools = {
+        "web": ["web_search"],
+        "vector": ["vector_search"],
+        "both": ["web_search", "vector_search"]
+    }.get(request.search_type, ["web_search", "vector_search"])
+    try:
+        result = await get_supervisor().process({
+            "workflow_type": "query_processing",
+            "original_task": request.query,
+            "parsed_query": request.query,
+            "suggested_tools": tools
+        })
+        return {
+            "status": "success",
+            "timestamp": datetime.utcnow().isoformat(),
+            "result": result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/document")
 async def add_document(request: DocumentRequest):
     """Document addition endpoint"""
     try:
-        result = await VectorStore.arun(
-            content=request.content,
-            metadata=request.metadata
-        )
+        # Through the shared store, so the BM25 index sees the new chunks too
+        result = await run_blocking(get_ingestor().ingest, [(request.content, request.metadata)])
+        result = result["documents"][0]
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        # Cached answers may no longer reflect the corpus
+        get_response_cache().invalidate()
         return {
             "status": "success",
             "timestamp": datetime.utcnow().isoformat(),
@@ -80,6 +149,51 @@ async def add_document(request: DocumentRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.websocket("/ws/supervisor")
+async def supervisor_updates(websocket: WebSocket):
+    """Stream workflow deltas and periodic active-workflow snapshots.
+
+    Clients subscribe with {"type": "subscribe_all"} or filter with
+    {"type": "subscribe", "workflows": [...], "agents": [...]}; a filter
+    applies to every message type, periodic snapshots included. They can
+    request {"type": "get_status", "workflow_id": ...} for one workflow's
+    full status.
+    """
+    supervisor = get_supervisor()
+    broadcaster = supervisor.broadcaster
+
+    async def on_message(subscriber, data: Dict[str, Any]):
+        message_type = data.get("type")
+        if message_type in ("subscribe", "subscribe_all", "get_active_workflows"):
+            # Start the subscriber from a snapshot of what its filter covers; deltas follow
+            broadcaster.send(
+                subscriber,
+                supervisor.active_workflows_snapshot(subscriber.workflows),
+                coalesce_key="active_workflows"
+            )
+        elif message_type == "get_status":
+            workflow_id = data.get("workflow_id")
+            broadcaster.send(subscriber, {
+                "type": "workflow_status",
+                "workflow_id": workflow_id,
+                "status": supervisor.get_workflow_status(workflow_id),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    await broadcaster.serve(websocket, on_message=on_message)
+
+@app.get("/api/supervisor/stats")
+async def supervisor_stats():
+    """Workflow memory gauges, circuit breaker states and WebSocket fan-out counters"""
+    supervisor = get_supervisor()
+    return {
+        "status": "success",
+        "timestamp": datetime.utcnow().isoformat(),
+        "workflows": supervisor.memory_usage(),
+        "circuits": supervisor.get_circuit_states(),
+        "broadcast": supervisor.broadcaster.stats()
+    }
+
 # Add documentation tags
 app.openapi_tags = [
     {
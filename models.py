@@ -49,6 +49,32 @@ class DocumentInput(BaseModel):
         description="Additional metadata for the document"
     )
 
+class DocumentResponse(BaseModel):
+    """Model for the result of inserting a document"""
+    document_id: str
+    status: str
+    message: str
+    chunks_created: int
+    metadata: Optional[Dict[str, Any]] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class BatchIngestStats(BaseModel):
+    """Model for bulk ingestion throughput"""
+    documents: int
+    chunks: int
+    batches: int
+    batch_size: int
+    embed_seconds: float
+    upsert_seconds: float
+    total_seconds: float
+    documents_per_second: float
+    chunks_per_second: float
+
+class BatchDocumentResponse(BaseModel):
+    """Model for a bulk document insertion"""
+    documents: List[DocumentResponse]
+    stats: BatchIngestStats
+
 class HealthCheck(BaseModel):
     """Model for API health check response"""
     status: str = "healthy"
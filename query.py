@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from ..models import QueryInput, SearchResponse
 from ..dependencies import get_rag_system, RAGSystem
 from typing import List
@@ -10,9 +11,24 @@ async def stream_query(
     query_input: QueryInput,
     rag_system: RAGSystem = Depends(get_rag_system)
 ):
-    """Stream the query processing results"""
-    # Implementation would depend on your streaming requirements
-    pass
+    """Stream stage events and response tokens as Server-Sent Events"""
+    return StreamingResponse(
+        rag_system.stream_query(query_input.query, query_input.context),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.get("/stats")
+async def get_query_stats(
+    rag_system: RAGSystem = Depends(get_rag_system)
+):
+    """How often web search was skipped because local documents sufficed"""
+    return {
+        "web_search": rag_system.query_engine.search_gate_stats()
+    }
 
 @router.get("/history")
 async def get_query_history(
@@ -1,66 +1,343 @@
-from typing import Dict, Any
-from langgraph.graph import Graph, END
-from agents import InputParserAgent, RetrievalAgent, SearchAgent
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, TypedDict, Annotated, AsyncIterator
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
+from agents import InputParserAgent, RetrievalAgent, SearchAgent, SearchError
 from vector_store import ChromaVectorStore
 from llm_config import get_llm
+from cache import ResponseCache, get_response_cache
+from context_builder import ContextBuilder, get_context_builder
+from concurrency import run_blocking
+from rule_parser import is_time_sensitive
+
+def _merge_timings(left: Optional[Dict[str, float]], right: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """Reducer so concurrently running stages can each report their own timing"""
+    return {**(left or {}), **(right or {})}
+
+class RAGState(TypedDict, total=False):
+    query: str
+    parsed_query: Dict[str, Any]
+    retrieved_docs: List[str]
+    retrieval_scores: List[float]
+    search_results: str
+    search_error: str
+    final_response: str
+    prompt_tokens: int
+    context_stats: Dict[str, Any]
+    web_search_skipped: bool
+    stage_timings: Annotated[Dict[str, float], _merge_timings]
 
 class AgenticRAGSystem:
-    def __init__(self):
-        self.vector_store = ChromaVectorStore()
+    """LangGraph RAG pipeline: parse, retrieve, optional web search, generate.
+
+    With a positive `web_search_max_distance`, web search is gated on
+    retrieval: it runs only when the closest local chunk is farther than the
+    threshold, or when the query is time-sensitive. Otherwise web search runs
+    unconditionally, concurrently with retrieval.
+    """
+    def __init__(
+        self,
+        parallel: bool = True,
+        response_cache: Optional[ResponseCache] = None,
+        vector_store: Optional[ChromaVectorStore] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        web_search_max_distance: Optional[float] = None
+    ):
+        self.vector_store = vector_store or ChromaVectorStore()
         self.input_parser = InputParserAgent()
         self.retrieval_agent = RetrievalAgent(self.vector_store)
         self.search_agent = SearchAgent()
         self.llm = get_llm()
+        self.parallel = parallel
+        self.response_cache = response_cache or get_response_cache()
+        self.context_builder = context_builder or get_context_builder()
+        if web_search_max_distance is None:
+            web_search_max_distance = float(os.getenv("WEB_SEARCH_MAX_DISTANCE", "1.0"))
+        self.web_search_max_distance = web_search_max_distance
+        self._gate_lock = threading.Lock()
+        self.web_search_runs = 0
+        self.web_search_skipped = 0
+        self.web_search_forced = 0
+        self.search_time_ema: Optional[float] = None
         self.workflow = self._create_workflow()
 
-    def _create_workflow(self) -> Graph:
+    def _timed(self, stage: str, func, afunc) -> RunnableLambda:
+        """Wrap a stage so its wall time is reported in state["stage_timings"].
+
+        The sync body serves process_query and the async body serves
+        aprocess_query, so the async path never blocks the event loop.
+        """
+        def node(state: RAGState) -> Dict[str, Any]:
+            start = time.perf_counter()
+            update = func(state)
+            update["stage_timings"] = {stage: time.perf_counter() - start}
+            return update
+
+        async def anode(state: RAGState) -> Dict[str, Any]:
+            start = time.perf_counter()
+            update = await afunc(state)
+            update["stage_timings"] = {stage: time.perf_counter() - start}
+            return update
+
+        return RunnableLambda(node, afunc=anode, name=stage)
+
+    def _needs_web_search(self, state: RAGState) -> str:
+        """Route after retrieval: "search" unless local documents are close enough"""
+        scores = state.get("retrieval_scores") or []
+        time_sensitive = is_time_sensitive(state["query"])
+        needed = time_sensitive or not scores or min(scores) > self.web_search_max_distance
+        with self._gate_lock:
+            if needed:
+                self.web_search_runs += 1
+                self.web_search_forced += time_sensitive
+            else:
+                self.web_search_skipped += 1
+        return "search" if needed else "skip_search"
+
+    def _record_search_time(self, elapsed: float):
+        # Moving average of web search time, used to estimate the latency skipping saves
+        with self._gate_lock:
+            if self.search_time_ema is None:
+                self.search_time_ema = elapsed
+            else:
+                self.search_time_ema = 0.8 * self.search_time_ema + 0.2 * elapsed
+
+    def search_gate_stats(self) -> Dict[str, Any]:
+        with self._gate_lock:
+            gated = self.web_search_runs + self.web_search_skipped
+            return {
+                "enabled": self.web_search_max_distance > 0,
+                "max_distance": self.web_search_max_distance,
+                "runs": self.web_search_runs,
+                "skipped": self.web_search_skipped,
+                "forced_time_sensitive": self.web_search_forced,
+                "skip_rate": self.web_search_skipped / gated if gated else 0.0,
+                "avg_search_time": self.search_time_ema,
+                "estimated_time_saved": self.web_search_skipped * (self.search_time_ema or 0.0)
+            }
+
+    def _create_workflow(self):
         def parse_input(state):
-            query = state["query"]
-            parsed = self.input_parser.parse_input(query)
-            state["parsed_query"] = parsed
-            return {"next": "retrieve"}
+            parsed = self.input_parser.parse_input(state["query"])
+            return {"parsed_query": parsed}
+
+        async def aparse_input(state):
+            parsed = await self.input_parser.aparse_input(state["query"])
+            return {"parsed_query": parsed}
 
         def retrieve_docs(state):
-            query = state["query"]
-            docs = self.retrieval_agent.retrieve_relevant_docs(query)
-            state["retrieved_docs"] = docs
-            return {"next": "search"}
+            scored = self.retrieval_agent.retrieve_scored_docs(state["query"])
+            return {
+                "retrieved_docs": [content for content, _ in scored],
+                "retrieval_scores": [score for _, score in scored]
+            }
+
+        async def aretrieve_docs(state):
+            scored = await self.retrieval_agent.aretrieve_scored_docs(state["query"])
+            return {
+                "retrieved_docs": [content for content, _ in scored],
+                "retrieval_scores": [score for _, score in scored]
+            }
 
         def search_web(state):
-            query = state["query"]
-            search_results = self.search_agent.search(query)
-            state["search_results"] = search_results
-            return {"next": "generate_response"}
+            start = time.perf_counter()
+            try:
+                search_results = self.search_agent.search(state["query"])
+            except SearchError as e:
+                # Answer from local documents; the failure is reported, not used as context
+                return {"search_results": "", "search_error": str(e), "web_search_skipped": False}
+            self._record_search_time(time.perf_counter() - start)
+            return {"search_results": search_results, "web_search_skipped": False}
+
+        async def asearch_web(state):
+            start = time.perf_counter()
+            try:
+                search_results = await self.search_agent.asearch(state["query"])
+            except SearchError as e:
+                return {"search_results": "", "search_error": str(e), "web_search_skipped": False}
+            self._record_search_time(time.perf_counter() - start)
+            return {"search_results": search_results, "web_search_skipped": False}
+
+        def skip_search(state):
+            return {"search_results": "", "web_search_skipped": True}
+
+        async def askip_search(state):
+            return skip_search(state)
 
         def generate_response(state):
-            prompt = f"""
-            Based on the following information, provide a comprehensive response:
-            
-            Original Query: {state['query']}
-            Parsed Query: {state['parsed_query']}
-            Retrieved Documents: {state['retrieved_docs']}
-            Web Search Results: {state['search_results']}
-            """
+            prompt, context_stats = self._build_prompt(state)
             response = self.llm.invoke(prompt)
-            state["final_response"] = response.content
-            return END
-
-        workflow = Graph()
-        
-        workflow.add_node("parse", parse_input)
-        workflow.add_node("retrieve", retrieve_docs)
-        workflow.add_node("search", search_web)
-        workflow.add_node("generate_response", generate_response)
-        
-        workflow.set_entry_point("parse")
-        
-        workflow.add_edge("parse", "retrieve")
-        workflow.add_edge("retrieve", "search")
-        workflow.add_edge("search", "generate_response")
-        
+            return {
+                "final_response": response.content,
+                "prompt_tokens": context_stats["prompt_tokens"],
+                "context_stats": context_stats
+            }
+
+        async def agenerate_response(state):
+            prompt, context_stats = self._build_prompt(state)
+            response = await self.llm.ainvoke(prompt)
+            return {
+                "final_response": response.content,
+                "prompt_tokens": context_stats["prompt_tokens"],
+                "context_stats": context_stats
+            }
+
+        workflow = StateGraph(RAGState)
+
+        workflow.add_node("parse", self._timed("parse", parse_input, aparse_input))
+        workflow.add_node("retrieve", self._timed("retrieve", retrieve_docs, aretrieve_docs))
+        workflow.add_node("search", self._timed("search", search_web, asearch_web))
+        workflow.add_node(
+            "generate_response",
+            self._timed("generate_response", generate_response, agenerate_response)
+        )
+
+        if self.web_search_max_distance > 0:
+            workflow.add_node("skip_search", self._timed("skip_search", skip_search, askip_search))
+            if self.parallel:
+                workflow.add_edge(START, "parse")
+                workflow.add_edge(START, "retrieve")
+            else:
+                workflow.add_edge(START, "parse")
+                workflow.add_edge("parse", "retrieve")
+            workflow.add_conditional_edges("retrieve", self._needs_web_search, ["search", "skip_search"])
+            # Exactly one of the two barriers fires, whichever branch was taken
+            workflow.add_edge(["parse", "search"], "generate_response")
+            workflow.add_edge(["parse", "skip_search"], "generate_response")
+        elif self.parallel:
+            # retrieve and search only read state["query"], so all three
+            # stages fan out from the start and join before generation
+            for stage in ("parse", "retrieve", "search"):
+                workflow.add_edge(START, stage)
+            workflow.add_edge(["parse", "retrieve", "search"], "generate_response")
+        else:
+            workflow.add_edge(START, "parse")
+            workflow.add_edge("parse", "retrieve")
+            workflow.add_edge("retrieve", "search")
+            workflow.add_edge("search", "generate_response")
+
+        workflow.add_edge("generate_response", END)
+
         return workflow.compile()
 
+    def _build_prompt(self, state: RAGState):
+        """Budgeted prompt plus context stats (prompt_tokens, dedup/truncation counts)"""
+        return self.context_builder.build(
+            query=state["query"],
+            parsed_query=state.get("parsed_query"),
+            documents=state.get("retrieved_docs", []),
+            # Hybrid and reranked results are already in the order to use
+            scores=None if self.retrieval_agent.ranked else state.get("retrieval_scores"),
+            search_results=state.get("search_results", "")
+        )
+
+    def _with_latency_report(self, result: Dict[str, Any], wall_time: float) -> Dict[str, Any]:
+        """Attach total wall time and the latency saved versus running stages serially"""
+        timings = result.get("stage_timings", {})
+        return {
+            **result,
+            "total_time": wall_time,
+            "latency_saved": max(0.0, sum(timings.values()) - wall_time)
+        }
+
+    def _cached_result(self, query: str, response: str) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "final_response": response,
+            "cache_hit": True,
+            "stage_timings": {},
+            "total_time": 0.0,
+            "latency_saved": 0.0
+        }
+
+    def _lookup_cached(self, query: str) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Cached response and query embedding; the query is only embedded
+        for the semantic tier, after an exact-match miss"""
+        cached = self.response_cache.get_exact(query)
+        if cached is not None or not self.response_cache.semantic_enabled:
+            return cached, None
+        embedding = self.vector_store.embeddings.embed_query(query)
+        return self.response_cache.get_similar(embedding), embedding
+
+    async def _alookup_cached(self, query: str) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Async variant of _lookup_cached"""
+        cached = self.response_cache.get_exact(query)
+        if cached is not None or not self.response_cache.semantic_enabled:
+            return cached, None
+        embedding = await run_blocking(self.vector_store.embeddings.embed_query, query)
+        return self.response_cache.get_similar(embedding), embedding
+
     def process_query(self, query: str) -> Dict[str, Any]:
         """Process a query through the entire RAG system"""
-        config = {"query": query}
-        return self.workflow.invoke(config)
\ No newline at end of file
+        start = time.perf_counter()
+        generation = self.response_cache.generation
+        cached, embedding = self._lookup_cached(query)
+        if cached is not None:
+            return self._cached_result(query, cached)
+
+        result = self.workflow.invoke({"query": query})
+        self.response_cache.set(query, result["final_response"], embedding, generation)
+        return {**self._with_latency_report(result, time.perf_counter() - start), "cache_hit": False}
+
+    async def aprocess_query(self, query: str) -> Dict[str, Any]:
+        """Async variant of process_query; independent stages run concurrently"""
+        start = time.perf_counter()
+        generation = self.response_cache.generation
+        cached, embedding = await self._alookup_cached(query)
+        if cached is not None:
+            return self._cached_result(query, cached)
+
+        result = await self.workflow.ainvoke({"query": query})
+        self.response_cache.set(query, result["final_response"], embedding, generation)
+        return {**self._with_latency_report(result, time.perf_counter() - start), "cache_hit": False}
+
+    async def astream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """Process a query, yielding stage events as they finish and then response tokens"""
+        start = time.perf_counter()
+        generation = self.response_cache.generation
+        cached, embedding = await self._alookup_cached(query)
+        if cached is not None:
+            yield {"event": "token", "content": cached}
+            yield {"event": "done", **self._cached_result(query, cached)}
+            return
+
+        result: Dict[str, Any] = {"query": query, "stage_timings": {}}
+        async for mode, chunk in self.workflow.astream(
+            {"query": query},
+            stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # Only the answer is streamed; the parser's LLM output is internal
+                if metadata.get("langgraph_node") == "generate_response" and message.content:
+                    yield {"event": "token", "content": message.content}
+                continue
+
+            for stage, update in chunk.items():
+                timings = update.pop("stage_timings", {})
+                result["stage_timings"].update(timings)
+                result.update(update)
+                if stage == "generate_response":
+                    continue
+                event = {"event": "stage", "stage": stage, "elapsed": timings.get(stage)}
+                if stage == "retrieve":
+                    event["documents"] = len(update.get("retrieved_docs", []))
+                if stage in ("search", "skip_search"):
+                    event["web_search_skipped"] = update.get("web_search_skipped", False)
+                    if update.get("search_error"):
+                        event["search_error"] = update["search_error"]
+                yield event
+
+        self.response_cache.set(query, result["final_response"], embedding, generation)
+        report = self._with_latency_report(result, time.perf_counter() - start)
+        yield {
+            "event": "done",
+            "cache_hit": False,
+            "prompt_tokens": result.get("prompt_tokens"),
+            "web_search_skipped": result.get("web_search_skipped", False),
+            "stage_timings": report["stage_timings"],
+            "total_time": report["total_time"],
+            "latency_saved": report["latency_saved"]
+        }
\ No newline at end of file
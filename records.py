@@ -0,0 +1,101 @@
+from typing import Dict, Any, Optional
+from datetime import datetime
+import time
+
+# Records store monotonic nanoseconds; wall-clock datetimes are derived from
+# this anchor only when a record is actually displayed or serialized
+_WALL_ANCHOR_NS = time.time_ns()
+_MONOTONIC_ANCHOR_NS = time.monotonic_ns()
+
+def monotonic_ns_to_datetime(timestamp_ns: int) -> datetime:
+    return datetime.utcfromtimestamp((_WALL_ANCHOR_NS + timestamp_ns - _MONOTONIC_ANCHOR_NS) / 1e9)
+
+def datetime_to_monotonic_ns(timestamp: datetime) -> int:
+    """Inverse of monotonic_ns_to_datetime, for records restored from storage"""
+    epoch_ns = int((timestamp - datetime(1970, 1, 1)).total_seconds() * 1e9)
+    return epoch_ns - _WALL_ANCHOR_NS + _MONOTONIC_ANCHOR_NS
+
+class StepRecord:
+    """One workflow step; supports read-only dict-style access for existing callers"""
+    __slots__ = ("step_id", "action", "result", "timestamp_ns", "_formatted")
+
+    def __init__(self, step_id: int, action: Dict[str, Any], result: Dict[str, Any]):
+        self.step_id = step_id
+        self.action = action
+        self.result = result
+        self.timestamp_ns = time.monotonic_ns()
+        self._formatted: Optional[str] = None
+
+    @property
+    def timestamp(self) -> datetime:
+        return monotonic_ns_to_datetime(self.timestamp_ns)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ("step_id", "action", "result", "timestamp"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step_id": self.step_id,
+            "action": self.action,
+            "result": self.result,
+            "timestamp": self.timestamp
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StepRecord":
+        step = cls(data["step_id"], data["action"], data["result"])
+        timestamp = data.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if isinstance(timestamp, datetime):
+            step.timestamp_ns = datetime_to_monotonic_ns(timestamp)
+        return step
+
+    def format(self) -> str:
+        """Prompt rendering of this step, computed once"""
+        if self._formatted is None:
+            lines = [
+                f"Step {self.step_id}:",
+                f"  Agent: {self.action.get('agent')}",
+                f"  Status: {self.result.get('status')}",
+                f"  Timestamp: {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+            ]
+            if "error" in self.result:
+                lines.append(f"  Error: {self.result['error']}")
+            self._formatted = "\n".join(lines)
+        return self._formatted
+
+class InteractionRecord:
+    """One entry of an agent's conversation history"""
+    __slots__ = ("agent", "action", "data", "timestamp_ns")
+
+    def __init__(self, agent: str, action: str, data: Dict[str, Any]):
+        self.agent = agent
+        self.action = action
+        self.data = data
+        self.timestamp_ns = time.monotonic_ns()
+
+    @property
+    def timestamp(self) -> datetime:
+        return monotonic_ns_to_datetime(self.timestamp_ns)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ("agent", "action", "data", "timestamp"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent,
+            "timestamp": self.timestamp,
+            "action": self.action,
+            "data": self.data
+        }
\ No newline at end of file
@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from langchain.docstore.document import Document
+
+class Reranker:
+    """Rerank over-fetched candidates into a diverse top-k.
+
+    Selection is maximal marginal relevance over the candidates' stored
+    embeddings: each pick maximizes `lambda_mult * relevance - (1 -
+    lambda_mult) * similarity to the picks so far`. With strategy="mmr"
+    relevance is cosine similarity to the query. With
+    strategy="cross_encoder" it is the cross-encoder score, from one batched
+    predict call over all candidates, min-max scaled to [0, 1].
+    """
+    def __init__(
+        self,
+        strategy: str = "mmr",
+        lambda_mult: float = 0.7,
+        model_name: Optional[str] = None,
+        batch_size: int = 32
+    ):
+        if strategy not in ("mmr", "cross_encoder"):
+            raise ValueError(f"Unknown rerank strategy: {strategy}")
+        self.strategy = strategy
+        self.lambda_mult = lambda_mult
+        self.model_name = model_name or os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def cross_encoder(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _relevance(self, query: str, documents: List[Document], similarities: np.ndarray) -> np.ndarray:
+        if self.strategy == "mmr":
+            return similarities
+        scores = np.asarray(
+            self.cross_encoder.predict(
+                [(query, doc.page_content) for doc in documents],
+                batch_size=self.batch_size
+            ),
+            dtype=np.float32
+        )
+        spread = scores.max() - scores.min()
+        return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+    def rerank(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        candidates: List[Tuple[Document, float, Sequence[float]]],
+        k: int = 3
+    ) -> List[Tuple[Document, float]]:
+        """Pick k of the (document, distance, embedding) candidates, best first"""
+        if len(candidates) <= 1:
+            return [(doc, distance) for doc, distance, _ in candidates]
+
+        embeddings = np.asarray([embedding for _, _, embedding in candidates], dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        query_vector = np.array(query_embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+
+        relevance = self._relevance(query, [doc for doc, _, _ in candidates], embeddings @ query_vector)
+        pairwise = embeddings @ embeddings.T
+
+        selected = [int(np.argmax(relevance))]
+        # Highest similarity of each candidate to anything already selected
+        redundancy = pairwise[selected[0]].copy()
+        available = np.ones(len(candidates), dtype=bool)
+        available[selected[0]] = False
+        while len(selected) < min(k, len(candidates)):
+            scores = self.lambda_mult * relevance - (1 - self.lambda_mult) * redundancy
+            scores[~available] = -np.inf
+            pick = int(np.argmax(scores))
+            selected.append(pick)
+            available[pick] = False
+            np.maximum(redundancy, pairwise[pick], out=redundancy)
+
+        return [(candidates[i][0], candidates[i][1]) for i in selected]
@@ -0,0 +1,98 @@
+from typing import Dict, Any
+import asyncio
+import random
+import time
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = ("Timeout", "Connection", "RateLimit", "ServiceUnavailable", "InternalServerError")
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its dependency's circuit is open"""
+
+def is_transient_error(error: BaseException) -> bool:
+    """Classify errors that are worth retrying (timeouts, dropped connections, 429/5xx)"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in TRANSIENT_STATUS_CODES
+
+    # Client libraries (httpx, groq, tavily) define their own hierarchies,
+    # so fall back to matching on class names
+    return any(
+        marker in cls.__name__
+        for cls in type(error).__mro__
+        for marker in TRANSIENT_ERROR_NAMES
+    )
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """Per-dependency breaker: closed -> open after repeated failures -> half-open probe"""
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.total_failures = 0
+        self.rejected_calls = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError if the dependency should not be called right now"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected_calls += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            # Only one probe call at a time while deciding whether to close
+            if self.probe_in_flight:
+                self.rejected_calls += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+            self.probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Free the half-open probe slot when a call ended without a verdict (cancelled, or a non-transient error)"""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "rejected_calls": self.rejected_calls,
+            "open_for": time.monotonic() - self.opened_at if self.opened_at else None
+        }
\ No newline at end of file
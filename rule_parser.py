@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have
+how i if in into is it its me my of on or our should so than that the their
+them then there these they this to was we were what when where which who whom
+why will with would you your about tell give show find please explain
+describe define list compare vs versus between much many
+""".split())
+
+# Keeps identifiers such as E1234, ERR-42 or v1.2.3 as single terms
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_\-.]*[A-Za-z0-9]|[A-Za-z0-9]")
+
+_REQUEST_TYPES = [
+    ("comparison", re.compile(r"\b(vs\.?|versus|compare|comparison|difference between|better than)\b", re.I)),
+    ("how_to", re.compile(r"^\s*(how (do|can|to|should|would)|steps to|guide to)\b", re.I)),
+    ("definition", re.compile(r"^\s*(what (is|are)( an?| the)?|define|meaning of|who (is|was))\b", re.I)),
+    ("explanation", re.compile(r"^\s*(why|explain|how does|how did)\b", re.I)),
+    ("list", re.compile(r"^\s*(list|which|top \d+|examples? of)\b", re.I)),
+    ("factual", re.compile(r"^\s*(when|where|who|how (many|much|long|old))\b", re.I)),
+    ("troubleshooting", re.compile(r"\b(error|exception|fail(s|ed|ing)?|not working|bug|crash(es|ed)?)\b", re.I)),
+]
+
+_TIME_SENSITIVE = re.compile(
+    r"\b(latest|today|tonight|yesterday|current(ly)?|recent(ly)?|news|now|"
+    r"this (week|month|year)|upcoming|price|score|20\d\d)\b",
+    re.I
+)
+
+def is_time_sensitive(query: str) -> bool:
+    """Whether a query asks about recent or changing information"""
+    return bool(_TIME_SENSITIVE.search(query))
+
+class RuleBasedQueryParser:
+    """Local keyword extraction and query classification, no LLM involved"""
+    def __init__(self, max_key_terms: int = 8):
+        self.max_key_terms = max_key_terms
+
+    def _classify(self, query: str) -> str:
+        for request_type, pattern in _REQUEST_TYPES:
+            if pattern.search(query):
+                return request_type
+        return "general"
+
+    def _topic(self, tokens: List[str]) -> str:
+        # Longest run of consecutive content words approximates the noun phrase
+        best: List[str] = []
+        run: List[str] = []
+        for token in tokens + [""]:
+            if token and token.lower() not in STOPWORDS:
+                run.append(token)
+                continue
+            if len(run) > len(best):
+                best = run
+            run = []
+        return " ".join(best)
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        tokens = _TOKEN.findall(query)
+        # Short tokens are usually noise, except acronyms ("AI", "UI") and identifiers
+        content = [
+            token for token in tokens
+            if token.lower() not in STOPWORDS
+            and (len(token) > 2 or any(c.isdigit() or c.isupper() for c in token))
+        ]
+        counts = Counter(token.lower() for token in content)
+        first_seen: Dict[str, str] = {}
+        for token in content:
+            first_seen.setdefault(token.lower(), token)
+        position = {term: i for i, term in enumerate(first_seen)}
+        key_terms = [
+            first_seen[term] for term, _ in sorted(
+                counts.items(),
+                key=lambda item: (-item[1], position[item[0]])
+            )
+        ][:self.max_key_terms]
+
+        request_type = self._classify(query)
+        topic = self._topic(tokens)
+        return {
+            "topic": topic,
+            "key_terms": key_terms,
+            "request_type": request_type,
+            "time_sensitive": is_time_sensitive(query),
+            "word_count": len(tokens),
+            "ambiguous": not key_terms or (request_type == "general" and len(key_terms) < 2)
+        }
+
+    @staticmethod
+    def format(parsed: Dict[str, Any]) -> str:
+        """Render a parse in the same shape as the LLM parser's analysis"""
+        return "\n".join([
+            f"1. Main topic: {parsed['topic'] or 'unknown'}",
+            f"2. Key terms: {', '.join(parsed['key_terms']) or 'none'}",
+            f"3. Type of information requested: {parsed['request_type'].replace('_', ' ')}"
+            + (" (time-sensitive)" if parsed["time_sensitive"] else "")
+        ])
\ No newline at end of file
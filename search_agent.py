@@ -1,9 +1,12 @@
-from .base_agent import BaseAgent
+from typing import Dict, Any
+from base_agent import BaseAgent
 from Graph.Tool.Tools import SearchEngine, VectorSearch
+import asyncio
 
 class SearchAgent(BaseAgent):
     def __init__(self):
         super().__init__("search")
+        self.dependency = "tavily"
         self.web_search = SearchEngine
         self.vector_search = VectorSearch
     
@@ -16,15 +19,23 @@ class SearchAgent(BaseAgent):
             "suggested_tools": suggested_tools
         })
         
-        results = {}
+        searches = {}
         
         if "web_search" in suggested_tools:
-            web_results = await self._execute_web_search(parsed_query)
-            results["web_results"] = web_results
+            searches["web_results"] = self._execute_web_search(parsed_query)
             
         if "vector_search" in suggested_tools:
-            vector_results = await self._execute_vector_search(parsed_query)
-            results["vector_results"] = vector_results
+            searches["vector_results"] = self._execute_vector_search(parsed_query)
+
+        # Web and vector search are independent, so run them together
+        results = dict(zip(searches.keys(), await asyncio.gather(*searches.values())))
+
+        # Tavily reports failures as a string instead of raising; keep that
+        # text out of the results so it is never treated as evidence
+        web_results = results.get("web_results")
+        if web_results is not None and not isinstance(web_results, list):
+            results["web_results"] = []
+            results["web_error"] = str(web_results)
         
         self.log_interaction("search_completed", results)
         
@@ -0,0 +1,48 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one in-flight computation.
+
+    The first caller for a key starts the work as a task. Callers that
+    arrive with the same key while it runs await that task instead of
+    starting their own. The work is shielded, so one caller disconnecting
+    does not cancel it for the others.
+    """
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as unhandled
+            # when every waiter has gone away
+            task.exception()
+
+    async def do(self, key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._done(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / total if total else 0.0
+        }
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
\ No newline at end of file
@@ -0,0 +1,69 @@
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+
+class StateSummarizer:
+    """Compact, size-capped rendering of a workflow's state for supervisor prompts.
+
+    Values are compared with what the previous call rendered: changed keys
+    are shown (truncated), unchanged large values collapse to a short hash,
+    and the whole summary is capped at `max_total_chars` with changed keys
+    listed first.
+    """
+    def __init__(self, max_value_chars: int = 300, max_total_chars: int = 2000, blob_chars: int = 120):
+        self.max_value_chars = max_value_chars
+        self.max_total_chars = max_total_chars
+        self.blob_chars = blob_chars
+        self._last_hashes: Dict[str, str] = {}
+
+    @staticmethod
+    def _render(value: Any) -> str:
+        if isinstance(value, str):
+            return value
+        try:
+            return json.dumps(value, default=str, sort_keys=True)
+        except (TypeError, ValueError):
+            return str(value)
+
+    def _truncate(self, text: str) -> str:
+        if len(text) <= self.max_value_chars:
+            return text
+        return f"{text[:self.max_value_chars]}... (+{len(text) - self.max_value_chars} chars)"
+
+    def summarize(self, state: Dict[str, Any]) -> str:
+        # (key, rendered line, digest); removed keys carry no digest
+        changed: List[Tuple[str, str, Optional[str]]] = []
+        unchanged: List[Tuple[str, str, Optional[str]]] = []
+
+        for key, value in state.items():
+            rendered = self._render(value)
+            digest = hashlib.sha1(rendered.encode()).hexdigest()[:10]
+            if self._last_hashes.get(key) != digest:
+                changed.append((key, f"{key} (changed): {self._truncate(rendered)}", digest))
+            elif len(rendered) > self.blob_chars:
+                unchanged.append((key, f"{key}: <unchanged, {len(rendered)} chars, sha1:{digest}>", digest))
+            else:
+                unchanged.append((key, f"{key}: {rendered}", digest))
+
+        removed = [(key, f"{key}: <removed>", None) for key in self._last_hashes if key not in state]
+
+        lines = ["Current System State:"]
+        size = len(lines[0])
+        omitted = 0
+        for key, line, digest in changed + removed + unchanged:
+            if size + len(line) + 1 > self.max_total_chars:
+                # Skip just this entry; smaller ones after it may still fit
+                omitted += 1
+                continue
+            lines.append(line)
+            size += len(line) + 1
+            # Only what the model actually saw counts as its baseline, so an
+            # omitted change is still reported as changed next time
+            if digest is None:
+                self._last_hashes.pop(key, None)
+            else:
+                self._last_hashes[key] = digest
+
+        if omitted:
+            lines.append(f"... ({omitted} more keys omitted)")
+        return "\n".join(lines)
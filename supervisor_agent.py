@@ -1,28 +1,118 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Union
 from datetime import datetime
-from .base_agent import BaseAgent
+import asyncio
+from base_agent import BaseAgent
 from langchain_core.prompts import PromptTemplate
 from Config.llm import llm
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient_error
+from workflow_store import WorkflowStore
+from workflow_ids import new_workflow_id
+from records import StepRecord
+from checkpoint_store import CheckpointStore
+from state_summary import StateSummarizer
+from context_builder import estimate_tokens
+from broadcaster import Broadcaster
+from search_agent import SearchAgent
+from concurrency import run_blocking
+from collections import Counter
+from functools import lru_cache
+import hashlib
+import json
+import os
+import re
+
+_PARALLEL_MARKER = re.compile(r"^\s*PARALLEL\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
 
 class WorkflowState:
     """Helper class to manage workflow state"""
     def __init__(self, workflow_id: str, initial_data: Dict[str, Any]):
         self.workflow_id = workflow_id
         self.current_state = initial_data
-        self.steps = []
+        self.steps: List[StepRecord] = []
+        # Each step is rendered once; the prompt text is joined on demand
+        self._step_lines: List[str] = []
+        self._steps_prompt: Optional[str] = None
         self.start_time = datetime.utcnow()
         self.end_time = None
         self.status = "running"
         self.error = None
+        self.routing = None
+        self.plan: List[Union[str, List[str]]] = []
+        self.plan_position = 0
+        self.fingerprint = None
+        self.llm_calls = 0
+        self.fell_back_to_llm = False
+        self.state_summarizer = StateSummarizer()
+        self.prompt_sizes: List[Dict[str, int]] = []
 
     def add_step(self, action: Dict[str, Any], result: Dict[str, Any]):
-        self.steps.append({
-            "step_id": len(self.steps) + 1,
-            "action": action,
-            "result": result,
-            "timestamp": datetime.utcnow()
-        })
-        self.current_state.update(result)
+        step = StepRecord(len(self.steps) + 1, action, result)
+        self.steps.append(step)
+        # Each agent's output is kept under its own name, so the branches of
+        # a parallel group don't overwrite each other
+        agent_name = result.get("agent", action.get("agent"))
+        self.current_state.setdefault("results", {})[agent_name] = (
+            result.get("result") if result.get("status") == "success"
+            else {"error": result.get("error")}
+        )
+        if "parallel_group" not in action:
+            self.current_state["status"] = result.get("status")
+        # Render just this step; format_steps joins the lines when next asked
+        self._step_lines.append(step.format())
+        self._steps_prompt = None
+
+    def record_group(self, agent_names: List[str], results: List[Dict[str, Any]]):
+        """Overall outcome of a parallel group, kept apart from the per-agent results"""
+        failed = [name for name, result in zip(agent_names, results) if result.get("status") != "success"]
+        self.current_state["status"] = "error" if failed else "success"
+        self.current_state["parallel_group"] = {
+            "agents": agent_names,
+            "status": self.current_state["status"],
+            "failed": failed
+        }
+
+    def format_steps(self) -> str:
+        """Prompt rendering of all steps so far, joined once per new step"""
+        if not self.steps:
+            return "No previous steps executed."
+        if self._steps_prompt is None:
+            self._steps_prompt = "\n".join(["Previous Steps:", *self._step_lines])
+        return self._steps_prompt
+
+    def to_checkpoint(self, response: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            "workflow_id": self.workflow_id,
+            "fingerprint": self.fingerprint,
+            "status": self.status,
+            "error": self.error,
+            "routing": self.routing,
+            "plan": self.plan,
+            "plan_position": self.plan_position,
+            "llm_calls": self.llm_calls,
+            "fell_back_to_llm": self.fell_back_to_llm,
+            "start_time": self.start_time.isoformat(),
+            "current_state": self.current_state,
+            "steps": [step.to_dict() for step in self.steps],
+            "prompt_sizes": self.prompt_sizes,
+            "response": response
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Dict[str, Any]) -> "WorkflowState":
+        workflow_state = cls(checkpoint["workflow_id"], checkpoint["current_state"])
+        workflow_state.fingerprint = checkpoint["fingerprint"]
+        workflow_state.routing = checkpoint["routing"]
+        workflow_state.plan = checkpoint["plan"]
+        workflow_state.plan_position = checkpoint["plan_position"]
+        workflow_state.llm_calls = checkpoint["llm_calls"]
+        workflow_state.fell_back_to_llm = checkpoint["fell_back_to_llm"]
+        workflow_state.start_time = datetime.fromisoformat(checkpoint["start_time"])
+        workflow_state.prompt_sizes = checkpoint["prompt_sizes"]
+        for step_data in checkpoint["steps"]:
+            step = StepRecord.from_dict(step_data)
+            workflow_state.steps.append(step)
+            workflow_state._step_lines.append(step.format())
+        return workflow_state
 
     def complete(self, final_state: Dict[str, Any]):
         self.status = "completed"
@@ -35,8 +125,56 @@ class WorkflowState:
         self.error = error
 
 class SupervisorAgent(BaseAgent):
-    def __init__(self):
+    """Orchestrates registered agents through a workflow.
+
+    With routing="plan" the route is compiled once per workflow, from a
+    static plan for known workflow types or a single LLM planning call
+    otherwise, and executed without per-step LLM calls. Per-step LLM
+    decisions are used for routing="llm", and as the fallback after a
+    planned step fails.
+
+    A plan entry that is a list of agent names is a parallel group. The
+    group's agents all see the same state snapshot and run concurrently (at
+    most `max_parallel_agents` at a time). Every step's output is stored
+    under `state["results"][agent_name]`, and a group's overall outcome
+    under `state["parallel_group"]`.
+
+    Progress is published through `broadcaster` as small deltas: one
+    `workflow_update` message per status change or completed step, plus a
+    periodic compact `active_workflows` snapshot from `publish_snapshots`.
+    """
+    def __init__(
+        self,
+        routing: str = "plan",
+        max_parallel_agents: int = 4,
+        broadcaster: Optional[Broadcaster] = None
+    ):
         super().__init__("supervisor")
+        if routing not in ("plan", "llm"):
+            raise ValueError(f"Unknown routing mode: {routing}")
+        self.routing = routing
+        self.workflow_plans: Dict[str, List[Union[str, List[str]]]] = {
+            "query_processing": ["parser", "search", "retrieval"],
+            "document_ingestion": ["validator", "processor", "indexer"]
+        }
+        self.default_workflow = "query_processing"
+        self.parallel_limit = asyncio.Semaphore(max_parallel_agents)
+        self.planning_prompt = PromptTemplate(
+            input_variables=["task", "agents"],
+            template="""
+            You are the supervisor agent planning a RAG workflow.
+
+            Available Agents: {agents}
+
+            Task to Process:
+            {task}
+
+            List the agents to invoke, in execution order, as a comma-separated
+            list of agent names. Only use names from the available agents.
+
+            Plan:
+            """
+        )
         self.supervision_prompt = PromptTemplate(
             input_variables=["current_time", "current_user", "system_state", "task", "previous_steps"],
             template="""
@@ -60,7 +198,8 @@ class SupervisorAgent(BaseAgent):
             {previous_steps}
             
             Decide:
-            1. Which agent(s) to invoke next
+            1. Which agent(s) to invoke next (to run independent agents together,
+               add a line of the form "PARALLEL: agent_a, agent_b")
             2. What parameters to pass to them
             3. How to handle any errors or edge cases
             4. Whether to continue or terminate processing
@@ -69,11 +208,37 @@ class SupervisorAgent(BaseAgent):
             """
         )
         
-        self.active_workflows: Dict[str, WorkflowState] = {}
+        self.workflows = WorkflowStore(
+            max_archived=int(os.getenv("WORKFLOW_ARCHIVE_LIMIT", "1000")),
+            spill_path=os.getenv("WORKFLOW_ARCHIVE_PATH") or None
+        )
         self.available_agents: Dict[str, BaseAgent] = {}
-        self.execution_history: List[Dict[str, Any]] = []
         self.max_retries = 3
-        self.retry_delay = 1  # seconds
+        self.retry_delay = 1  # seconds, base of the exponential backoff
+        self.retry_policy = RetryPolicy(max_retries=self.max_retries, base_delay=self.retry_delay)
+        self.default_timeout = 30.0  # seconds per agent call
+        self.agent_timeouts: Dict[str, float] = {}
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        checkpoint_path = os.getenv("WORKFLOW_CHECKPOINT_PATH")
+        self.checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path else None
+        # Running checkpoints from other processes older than this are resumable;
+        # live runs refresh theirs several times per window, even mid-step
+        self.checkpoint_stale_after = float(os.getenv("WORKFLOW_CHECKPOINT_STALE_AFTER", "60"))
+        self.checkpoint_heartbeat = float(
+            os.getenv("WORKFLOW_CHECKPOINT_HEARTBEAT", str(self.checkpoint_stale_after / 4))
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.broadcaster = broadcaster or Broadcaster()
+        self.snapshot_interval = float(os.getenv("SUPERVISOR_SNAPSHOT_INTERVAL", "5"))
+        self.snapshot_limit = int(os.getenv("SUPERVISOR_SNAPSHOT_LIMIT", "100"))
+
+    @property
+    def active_workflows(self) -> Dict[str, WorkflowState]:
+        return self.workflows.active
+
+    @property
+    def execution_history(self) -> List[Dict[str, Any]]:
+        return self.workflows.history()
 
     def register_agent(self, agent: BaseAgent):
         """Register an agent with the supervisor"""
@@ -82,52 +247,192 @@ class SupervisorAgent(BaseAgent):
 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Main entry point for processing workflows"""
-        workflow_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        workflow_state = WorkflowState(workflow_id, input_data)
-        self.active_workflows[workflow_id] = workflow_state
+        fingerprint = self._fingerprint(input_data)
+
+        async def prepare() -> WorkflowState:
+            # An identical workflow abandoned by a previous process: pick it up
+            if self.checkpoints:
+                existing = await run_blocking(self.checkpoints.find_by_fingerprint, fingerprint)
+                if (
+                    existing
+                    and self.checkpoints.is_abandoned(existing, self.checkpoint_stale_after)
+                    and await run_blocking(self.checkpoints.claim, existing)
+                ):
+                    return self._restore(existing)
+
+            workflow_state = WorkflowState(new_workflow_id(), input_data)
+            workflow_state.fingerprint = fingerprint
+            return workflow_state
+
+        return await self._run_exclusive(fingerprint, prepare)
+
+    async def resume(self, workflow_id: str) -> Dict[str, Any]:
+        """Continue a checkpointed workflow from its last completed step"""
+        workflow_state = self.workflows.get(workflow_id)
+        if workflow_state is not None and workflow_state.fingerprint in self._inflight:
+            return await asyncio.shield(self._inflight[workflow_state.fingerprint])
+
+        if not self.checkpoints:
+            raise ValueError("Workflow checkpointing is not enabled")
+        checkpoint = await run_blocking(self.checkpoints.load, workflow_id)
+        if checkpoint is None:
+            raise ValueError(f"Unknown workflow: {workflow_id}")
+        if checkpoint["status"] != "running":
+            return checkpoint["response"] or self.workflows.get_archived(workflow_id)
+
+        async def prepare() -> WorkflowState:
+            if checkpoint["owner"] != self.checkpoints.owner and not (
+                self.checkpoints.is_abandoned(checkpoint, self.checkpoint_stale_after)
+                and await run_blocking(self.checkpoints.claim, checkpoint)
+            ):
+                raise ValueError(f"Workflow {workflow_id} is still running in another process")
+            return self._restore(checkpoint)
+
+        return await self._run_exclusive(checkpoint["fingerprint"], prepare)
+
+    def _restore(self, checkpoint: Dict[str, Any]) -> WorkflowState:
+        workflow_state = WorkflowState.from_checkpoint(checkpoint)
+        self.log_interaction("workflow_resumed", {
+            "workflow_id": workflow_state.workflow_id,
+            "steps_completed": len(workflow_state.steps)
+        })
+        return workflow_state
+
+    async def _run_exclusive(self, fingerprint: str, prepare) -> Dict[str, Any]:
+        """Run the workflow returned by `prepare()` unless an identical one is already in flight.
+
+        The fingerprint is claimed before the first await, so concurrent
+        identical requests always find it, even while `prepare` is still
+        looking up checkpoints. The workflow runs in its own task and every
+        caller, the first included, awaits it shielded, so one caller being
+        cancelled does not cancel it for the others.
+        """
+        task = self._inflight.get(fingerprint)
+        if task is not None:
+            self.log_interaction("workflow_reused", {"fingerprint": fingerprint})
+        else:
+            task = asyncio.ensure_future(self._prepare_and_run(prepare))
+            self._inflight[fingerprint] = task
+            task.add_done_callback(lambda done: self._inflight_done(fingerprint, done))
+        return await asyncio.shield(task)
+
+    async def _prepare_and_run(self, prepare) -> Dict[str, Any]:
+        return await self._run_workflow(await prepare())
+
+    def _inflight_done(self, fingerprint: str, task: asyncio.Task):
+        # Only drop our own claim, never a later run's
+        if self._inflight.get(fingerprint) is task:
+            del self._inflight[fingerprint]
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as unhandled
+            # when every caller has gone away
+            task.exception()
+
+    async def _run_workflow(self, workflow_state: WorkflowState) -> Dict[str, Any]:
+        workflow_id = workflow_state.workflow_id
+        self.workflows.add(workflow_id, workflow_state)
+        self._publish_update(workflow_state)
+        heartbeat = None
 
         try:
             self.log_interaction("workflow_started", {
                 "workflow_id": workflow_id,
-                "input_data": input_data
+                "input_data": workflow_state.current_state
             })
+            await self._checkpoint(workflow_state)
+            if self.checkpoints:
+                heartbeat = asyncio.ensure_future(self._heartbeat(workflow_id))
 
             result = await self._execute_workflow(workflow_state)
             
             workflow_state.complete(result)
+            self.workflows.update_status(workflow_id)
+            self._publish_update(workflow_state)
             self.log_interaction("workflow_completed", {
                 "workflow_id": workflow_id,
                 "result": result
             })
 
-            return self._prepare_workflow_response(workflow_state)
+            response = self._prepare_workflow_response(workflow_state)
+            await self._checkpoint(workflow_state, response)
+            await self._archive_workflow(workflow_state, response)
+            return response
 
         except Exception as e:
             workflow_state.fail(str(e))
+            self.workflows.update_status(workflow_id)
+            self._publish_update(workflow_state)
             self.log_interaction("workflow_failed", {
                 "workflow_id": workflow_id,
                 "error": str(e)
             })
+            await self._checkpoint(workflow_state)
+            await self._archive_workflow(workflow_state)
             raise
 
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, workflow_id: str):
+        """Refresh the checkpoint's heartbeat while steps run, since one step
+        with retries can outlast the stale window"""
+        while True:
+            await asyncio.sleep(self.checkpoint_heartbeat)
+            try:
+                await run_blocking(self.checkpoints.heartbeat, workflow_id)
+            except Exception as e:
+                self.log_interaction("checkpoint_heartbeat_failed", {
+                    "workflow_id": workflow_id,
+                    "error": str(e)
+                })
+
+    @staticmethod
+    def _fingerprint(input_data: Dict[str, Any]) -> str:
+        """Hash of the workflow input, ignoring per-call bookkeeping keys"""
+        payload = {
+            key: value for key, value in input_data.items()
+            if key not in ("workflow_id", "attempt", "timestamp")
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def _checkpoint(self, workflow_state: WorkflowState, response: Optional[Dict[str, Any]] = None):
+        if self.checkpoints:
+            await run_blocking(self.checkpoints.save, workflow_state.to_checkpoint(response))
+
     async def _execute_workflow(self, workflow_state: WorkflowState) -> Dict[str, Any]:
-        """Execute the workflow with supervision"""
+        """Execute the workflow with supervision, continuing from any restored progress"""
+        if workflow_state.routing is None:
+            workflow_state.routing = self.routing
+        if workflow_state.routing == "plan" and not workflow_state.fell_back_to_llm:
+            if not workflow_state.plan:
+                workflow_state.plan = await self._compile_plan(workflow_state)
+            if workflow_state.plan and await self._execute_plan(workflow_state):
+                return workflow_state.current_state
+            workflow_state.fell_back_to_llm = True
+
         while True:
-            next_action = await self._get_next_action(
-                workflow_state.current_state,
-                workflow_state.steps
-            )
+            workflow_state.llm_calls += 1
+            next_action = await self._get_next_action(workflow_state)
             
             if next_action["action"] == "terminate":
                 break
-            
-            step_result = await self._execute_step(
-                workflow_state.workflow_id,
-                next_action,
-                workflow_state.current_state
-            )
-            
-            workflow_state.add_step(next_action, step_result)
+
+            if next_action["action"] == "execute_parallel":
+                await self._execute_group(
+                    workflow_state,
+                    next_action["agents"],
+                    next_action.get("parameters", {}),
+                    source="llm"
+                )
+            else:
+                step_result = await self._execute_step(
+                    workflow_state.workflow_id,
+                    next_action,
+                    workflow_state.current_state
+                )
+                self._record_step(workflow_state, next_action, step_result)
+            await self._checkpoint(workflow_state)
             
             # Check for completion conditions
             if self._should_terminate_workflow(workflow_state):
@@ -135,67 +440,212 @@ class SupervisorAgent(BaseAgent):
         
         return workflow_state.current_state
 
-    async def _get_next_action(
-        self,
-        current_state: Dict[str, Any],
-        previous_steps: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Determine the next action using the supervision prompt"""
-        prompt_response = await llm.ainvoke(
-            self.supervision_prompt.format(
-                current_time=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                current_user=current_state.get("user", "system"),
-                system_state=self._format_system_state(current_state),
-                task=current_state.get("original_task", "No task specified"),
-                previous_steps=self._format_previous_steps(previous_steps)
+    async def _compile_plan(self, workflow_state: WorkflowState) -> List[Union[str, List[str]]]:
+        """Resolve the agent route once, before any step runs"""
+        workflow_type = workflow_state.current_state.get("workflow_type", self.default_workflow)
+        if workflow_type in self.workflow_plans:
+            plan = []
+            for entry in self.workflow_plans[workflow_type]:
+                if isinstance(entry, list):
+                    group = [agent_name for agent_name in entry if agent_name in self.available_agents]
+                    if len(group) > 1:
+                        plan.append(group)
+                    elif group:
+                        plan.append(group[0])
+                elif entry in self.available_agents:
+                    plan.append(entry)
+            return plan
+
+        workflow_state.llm_calls += 1
+        response = await llm.ainvoke(
+            self.planning_prompt.format(
+                task=workflow_state.current_state.get("original_task", "No task specified"),
+                agents=", ".join(self.available_agents.keys())
             )
         )
+        return self._parse_plan(response.content)
+
+    def _parse_plan(self, response: str) -> List[str]:
+        """Agent names in the order the planner mentioned them"""
+        response = response.lower()
+        positions = {
+            agent_name: response.find(agent_name.lower())
+            for agent_name in self.available_agents
+        }
+        return sorted(
+            (agent_name for agent_name, position in positions.items() if position >= 0),
+            key=positions.get
+        )
+
+    async def _execute_plan(self, workflow_state: WorkflowState) -> bool:
+        """Run the compiled plan; returns False if a step failed and routing must fall back"""
+        while workflow_state.plan_position < len(workflow_state.plan):
+            entry = workflow_state.plan[workflow_state.plan_position]
+            if isinstance(entry, list):
+                results = await self._execute_group(workflow_state, entry, {}, source="plan")
+            else:
+                action = {
+                    "action": "execute",
+                    "agent": entry,
+                    "parameters": {},
+                    "source": "plan"
+                }
+                step_result = await self._execute_step(
+                    workflow_state.workflow_id,
+                    action,
+                    workflow_state.current_state
+                )
+                self._record_step(workflow_state, action, step_result)
+                results = [step_result]
+
+            if any(result["status"] == "error" for result in results):
+                await self._checkpoint(workflow_state)
+                return False
+            workflow_state.plan_position += 1
+            await self._checkpoint(workflow_state)
+            if self._should_terminate_workflow(workflow_state):
+                return True
+        return True
+
+    async def _get_next_action(self, workflow_state: WorkflowState) -> Dict[str, Any]:
+        """Determine the next action using the supervision prompt"""
+        current_state = workflow_state.current_state
+        prompt = self.supervision_prompt.format(
+            current_time=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            current_user=current_state.get("user", "system"),
+            system_state=self._format_system_state(workflow_state),
+            task=current_state.get("original_task", "No task specified"),
+            previous_steps=workflow_state.format_steps()
+        )
+        workflow_state.prompt_sizes.append({
+            "step": len(workflow_state.steps) + 1,
+            "chars": len(prompt),
+            "tokens": estimate_tokens(prompt)
+        })
+        prompt_response = await llm.ainvoke(prompt)
         
         return self._parse_supervisor_decision(prompt_response.content)
 
+    async def _execute_group(
+        self,
+        workflow_state: WorkflowState,
+        agent_names: List[str],
+        parameters: Dict[str, Any],
+        source: str
+    ) -> List[Dict[str, Any]]:
+        """Run a parallel group against one state snapshot; each agent's output lands under state["results"]"""
+        snapshot = dict(workflow_state.current_state)
+        actions = [
+            {
+                "action": "execute",
+                "agent": agent_name,
+                "parameters": parameters,
+                "source": source,
+                "parallel_group": agent_names
+            }
+            for agent_name in agent_names
+        ]
+
+        async def run(action: Dict[str, Any]) -> Dict[str, Any]:
+            async with self.parallel_limit:
+                return await self._execute_step(workflow_state.workflow_id, action, snapshot)
+
+        results = list(await asyncio.gather(*(run(action) for action in actions)))
+        for action, result in zip(actions, results):
+            self._record_step(workflow_state, action, result)
+        workflow_state.record_group(agent_names, results)
+        return results
+
+    def _record_step(self, workflow_state: WorkflowState, action: Dict[str, Any], result: Dict[str, Any]):
+        workflow_state.add_step(action, result)
+        self._publish_update(workflow_state, workflow_state.steps[-1])
+
     async def _execute_step(
         self,
         workflow_id: str,
         action: Dict[str, Any],
         current_state: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Execute a single step with retry logic"""
+        """Execute a single step with timeout, retry and circuit-breaker logic"""
         agent_name = action["agent"]
         if agent_name not in self.available_agents:
             raise ValueError(f"Unknown agent: {agent_name}")
         
         agent = self.available_agents[agent_name]
-        retry_count = 0
+        breaker = self._get_circuit_breaker(agent)
+        timeout = self.agent_timeouts.get(agent_name, self.default_timeout)
+        attempt = 0
         
-        while retry_count <= self.max_retries:
+        while True:
+            attempt += 1
             try:
-                result = await agent.process({
-                    **current_state,
-                    **action.get("parameters", {}),
-                    "workflow_id": workflow_id,
-                    "attempt": retry_count + 1
-                })
+                breaker.before_call()
+            except CircuitOpenError as e:
+                return {
+                    "status": "error",
+                    "agent": agent_name,
+                    "error": str(e),
+                    "attempts": attempt - 1,
+                    "circuit": breaker.state
+                }
+
+            try:
+                result = await asyncio.wait_for(
+                    agent.process({
+                        **current_state,
+                        **action.get("parameters", {}),
+                        "workflow_id": workflow_id,
+                        "attempt": attempt
+                    }),
+                    timeout
+                )
+                breaker.record_success()
                 
                 return {
                     "status": "success",
                     "agent": agent_name,
                     "result": result,
-                    "attempts": retry_count + 1
+                    "attempts": attempt
                 }
                 
             except Exception as e:
-                retry_count += 1
-                if retry_count <= self.max_retries:
-                    await asyncio.sleep(self.retry_delay * retry_count)
+                transient = is_transient_error(e)
+                if transient:
+                    breaker.record_failure()
+                else:
+                    # A bad request says nothing about the dependency's health,
+                    # so neither count it nor let it close a half-open breaker
+                    breaker.release_probe()
+
+                if transient and attempt <= self.retry_policy.max_retries:
+                    await asyncio.sleep(self.retry_policy.delay(attempt))
                     continue
                 
                 return {
                     "status": "error",
                     "agent": agent_name,
-                    "error": str(e),
-                    "attempts": retry_count
+                    "error": str(e) or type(e).__name__,
+                    "transient": transient,
+                    "attempts": attempt
                 }
 
+            except BaseException:
+                # Cancelled mid-call: no verdict on the dependency, but a held
+                # probe slot would otherwise keep a half-open breaker shut forever
+                breaker.release_probe()
+                raise
+
+    def _get_circuit_breaker(self, agent: BaseAgent) -> CircuitBreaker:
+        """Breakers are keyed by the agent's upstream dependency (defaults to its name)"""
+        dependency = getattr(agent, "dependency", agent.name)
+        if dependency not in self.circuit_breakers:
+            self.circuit_breakers[dependency] = CircuitBreaker(dependency)
+        return self.circuit_breakers[dependency]
+
+    def get_circuit_states(self) -> List[Dict[str, Any]]:
+        """Circuit breaker state per dependency, for monitoring"""
+        return [breaker.snapshot() for breaker in self.circuit_breakers.values()]
+
     def _should_terminate_workflow(self, workflow_state: WorkflowState) -> bool:
         """Determine if the workflow should be terminated"""
         # Check for error conditions
@@ -208,8 +658,8 @@ class SupervisorAgent(BaseAgent):
             
         # Check for successful completion
         last_step = workflow_state.steps[-1] if workflow_state.steps else None
-        if last_step and last_step["result"].get("status") == "success":
-            if "final_response" in last_step["result"].get("result", {}):
+        if last_step and last_step.result.get("status") == "success":
+            if "final_response" in last_step.result.get("result", {}):
                 return True
         
         return False
@@ -225,42 +675,20 @@ class SupervisorAgent(BaseAgent):
             "steps_executed": len(workflow_state.steps),
             "final_state": workflow_state.current_state,
             "error": workflow_state.error,
-            "execution_timeline": workflow_state.steps
+            "execution_timeline": [step.to_dict() for step in workflow_state.steps],
+            "metrics": {
+                "routing": workflow_state.routing,
+                "plan": workflow_state.plan,
+                "steps": len(workflow_state.steps),
+                "llm_calls": workflow_state.llm_calls,
+                "fell_back_to_llm": workflow_state.fell_back_to_llm,
+                "prompt_sizes": workflow_state.prompt_sizes
+            }
         }
 
-    def _format_system_state(self, state: Dict[str, Any]) -> str:
-        """Format the current system state for the prompt"""
-        formatted_state = ["Current System State:"]
-        
-        for key, value in state.items():
-            if isinstance(value, dict):
-                formatted_state.append(f"{key}:")
-                for sub_key, sub_value in value.items():
-                    formatted_state.append(f"  {sub_key}: {sub_value}")
-            else:
-                formatted_state.append(f"{key}: {value}")
-        
-        return "\n".join(formatted_state)
-
-    def _format_previous_steps(self, steps: List[Dict[str, Any]]) -> str:
-        """Format previous steps for the prompt"""
-        if not steps:
-            return "No previous steps executed."
-        
-        formatted_steps = ["Previous Steps:"]
-        
-        for i, step in enumerate(steps, 1):
-            formatted_steps.extend([
-                f"Step {i}:",
-                f"  Agent: {step['action']['agent']}",
-                f"  Status: {step['result']['status']}",
-                f"  Timestamp: {step['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
-            ])
-            
-            if "error" in step["result"]:
-                formatted_steps.append(f"  Error: {step['result']['error']}")
-        
-        return "\n".join(formatted_steps)
+    def _format_system_state(self, workflow_state: WorkflowState) -> str:
+        """Format the current system state for the prompt as a diff-aware, size-capped summary"""
+        return workflow_state.state_summarizer.summarize(workflow_state.current_state)
 
     def _parse_supervisor_decision(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into a structured decision"""
@@ -269,6 +697,17 @@ class SupervisorAgent(BaseAgent):
             if "terminate" in response.lower():
                 return {"action": "terminate"}
             
+            # Only an explicit "PARALLEL: a, b" line starts a parallel group
+            marker = _PARALLEL_MARKER.search(response)
+            if marker:
+                agents = self._parse_agent_list(marker.group(1))
+                if len(agents) > 1:
+                    return {
+                        "action": "execute_parallel",
+                        "agents": agents,
+                        "parameters": self._extract_parameters(response)
+                    }
+
             # Extract agent and parameters
             for agent_name in self.available_agents.keys():
                 if agent_name.lower() in response.lower():
@@ -292,6 +731,16 @@ class SupervisorAgent(BaseAgent):
                 "reason": f"Error parsing supervisor decision: {str(e)}"
             }
 
+    def _parse_agent_list(self, text: str) -> List[str]:
+        """Registered agent names from a comma-separated list, in listed order"""
+        names = {agent_name.lower(): agent_name for agent_name in self.available_agents}
+        agents = []
+        for item in text.split(","):
+            agent_name = names.get(item.strip().strip("\"'`.").lower())
+            if agent_name and agent_name not in agents:
+                agents.append(agent_name)
+        return agents
+
     def _extract_parameters(self, response: str) -> Dict[str, Any]:
         """Extract parameters from the LLM response"""
         parameters = {}
@@ -318,30 +767,124 @@ class SupervisorAgent(BaseAgent):
 
     def get_workflow_status(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a specific workflow"""
-        if workflow_id not in self.active_workflows:
-            return None
+        workflow_state = self.workflows.get(workflow_id)
+        if workflow_state is None:
+            return self.workflows.get_archived(workflow_id)
         
-        workflow_state = self.active_workflows[workflow_id]
         return self._prepare_workflow_response(workflow_state)
 
-    def get_active_workflows(self) -> List[Dict[str, Any]]:
-        """Get all active workflows"""
+    def get_active_workflows(
+        self,
+        status: Optional[str] = None,
+        started_after: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get active workflows, oldest first, optionally filtered by status and start time"""
         return [
-            {
-                "workflow_id": workflow_id,
-                "status": state.status,
-                "start_time": state.start_time,
-                "steps_completed": len(state.steps)
-            }
-            for workflow_id, state in self.active_workflows.items()
+            self._active_summary(state)
+            for state in self.workflows.list_active(status, started_after, limit)
         ]
 
-    def cleanup_workflow(self, workflow_id: str):
+    @staticmethod
+    def _active_summary(state: WorkflowState) -> Dict[str, Any]:
+        return {
+            "workflow_id": state.workflow_id,
+            "status": state.status,
+            "start_time": state.start_time,
+            "steps_completed": len(state.steps)
+        }
+
+    async def _archive_workflow(self, workflow_state: WorkflowState, response: Optional[Dict[str, Any]] = None):
+        """Move a finished workflow to the bounded archive, keeping only a compact timeline"""
+        record = response or self._prepare_workflow_response(workflow_state)
+        summary = {
+            **{key: value for key, value in record.items() if key not in ("final_state", "execution_timeline")},
+            "execution_timeline": [self._step_summary(step) for step in workflow_state.steps]
+        }
+        self.workflows.archive_workflow(workflow_state.workflow_id, summary)
+        if self.workflows.spill_path:
+            await run_blocking(self.workflows.spill, record)
+
+    @staticmethod
+    def _step_summary(step: StepRecord) -> Dict[str, Any]:
+        """Compact view of a step, without its result payload"""
+        return {
+            "step_id": step.step_id,
+            "agent": step.action.get("agent"),
+            "status": step.result.get("status"),
+            "attempts": step.result.get("attempts"),
+            "error": step.result.get("error"),
+            "timestamp": step.timestamp
+        }
+
+    def _publish_update(self, workflow_state: WorkflowState, step: Optional[StepRecord] = None):
+        """Publish a workflow's status and, if given, the step just completed"""
+        if not self.broadcaster.subscribers:
+            return
+        self.broadcaster.publish(
+            {
+                "type": "workflow_update",
+                "workflow_id": workflow_state.workflow_id,
+                "status": {
+                    "status": workflow_state.status,
+                    "steps_completed": len(workflow_state.steps),
+                    "start_time": workflow_state.start_time,
+                    "end_time": workflow_state.end_time,
+                    "error": workflow_state.error
+                },
+                "step": self._step_summary(step) if step else None,
+                "timestamp": datetime.utcnow().isoformat()
+            },
+            agent=step.action.get("agent") if step else None,
+            workflow=workflow_state.workflow_id
+        )
+
+    def active_workflows_snapshot(self, workflow_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Status counts plus the oldest `snapshot_limit` active workflows,
+        optionally limited to the given IDs (a subscriber's workflow filter)"""
+        if workflow_ids is None:
+            counts = self.workflows.count_by_status()
+            workflows = self.get_active_workflows(limit=self.snapshot_limit)
+        else:
+            states = [self.workflows.get(workflow_id) for workflow_id in sorted(workflow_ids)]
+            states = [state for state in states if state is not None]
+            counts = dict(Counter(state.status for state in states))
+            workflows = [self._active_summary(state) for state in states[:self.snapshot_limit]]
+        return {
+            "type": "active_workflows",
+            "counts": counts,
+            "total": sum(counts.values()),
+            "workflows": workflows,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    async def publish_snapshots(self):
+        """Publish an active-workflows snapshot every `snapshot_interval` seconds while anyone listens"""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self.broadcaster.subscribers:
+                # A subscriber that falls behind only keeps the latest snapshot
+                self.broadcaster.publish(self.active_workflows_snapshot(), coalesce_key="active_workflows")
+
+    async def cleanup_workflow(self, workflow_id: str):
         """Clean up completed workflow data"""
-        if workflow_id in self.active_workflows:
-            workflow_state = self.active_workflows[workflow_id]
-            if workflow_state.status in ["completed", "failed"]:
-                # Archive workflow data if needed
-                self.execution_history.append(self._prepare_workflow_response(workflow_state))
-                # Remove from active workflows
-                del self.active_workflows[workflow_id]
\ No newline at end of file
+        workflow_state = self.workflows.get(workflow_id)
+        if workflow_state and workflow_state.status in ["completed", "failed"]:
+            await self._archive_workflow(workflow_state)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Gauges for workflow and interaction-history memory"""
+        return {
+            **self.workflows.memory_usage(),
+            "conversation_history": {
+                agent.name: len(agent.conversation_history)
+                for agent in [self, *self.available_agents.values()]
+            }
+        }
+
+@lru_cache()
+def get_supervisor() -> SupervisorAgent:
+    """Process-wide supervisor with the API's agents registered"""
+    supervisor = SupervisorAgent()
+    supervisor.register_agent(SearchAgent())
+    return supervisor
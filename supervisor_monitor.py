@@ -20,15 +20,23 @@ async def monitor_supervisor():
                 data = json.loads(message)
                 
                 if data["type"] == "workflow_update":
+                    # Deltas: the status change and at most one new step
                     print(f"\nWorkflow Update at {datetime.utcnow()}")
                     print(f"Workflow ID: {data['workflow_id']}")
                     print(f"Status: {data['status']['status']}")
-                    print("Steps completed:", len(data['status'].get('steps', [])))
+                    print("Steps completed:", data['status']['steps_completed'])
+                    step = data.get("step")
+                    if step:
+                        print(f"Step {step['step_id']}: {step['agent']} -> {step['status']}")
                 
                 elif data["type"] == "active_workflows":
-                    print("\nActive Workflows:")
+                    print(f"\nActive Workflows ({data['total']}, {data['counts']}):")
                     for workflow in data["workflows"]:
                         print(f"- {workflow['workflow_id']}: {workflow['status']}")
+
+                elif data["type"] == "workflow_status":
+                    print(f"\nWorkflow {data['workflow_id']}:")
+                    print(json.dumps(data["status"], indent=2, default=str))
             
             except Exception as e:
                 print(f"Error: {e}")
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from broadcaster import Broadcaster
+
+class FakeWebSocket:
+    def __init__(self, send_delay=0.0):
+        self.send_delay = send_delay
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, payload):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+def test_workflow_filter_applies_to_every_message_type():
+    async def scenario():
+        broadcaster = Broadcaster()
+        websocket = FakeWebSocket()
+        broadcaster.subscribe(websocket, workflows=["w1"])
+        broadcaster.publish({"type": "workflow_update", "id": "w1 step"}, agent="search", workflow="w1")
+        broadcaster.publish({"type": "workflow_update", "id": "w1 status"}, workflow="w1")
+        broadcaster.publish({"type": "workflow_update", "id": "w2 status"}, workflow="w2")
+        broadcaster.publish({"type": "active_workflows", "id": "snapshot"}, coalesce_key="active_workflows")
+        await asyncio.sleep(0.01)
+        return [message["id"] for message in websocket.sent]
+
+    assert asyncio.run(scenario()) == ["w1 step", "w1 status"]
+
+def test_agent_filter_skips_status_only_updates():
+    async def scenario():
+        broadcaster = Broadcaster()
+        websocket = FakeWebSocket()
+        broadcaster.subscribe(websocket, agents=["search"])
+        broadcaster.publish({"id": "search step"}, agent="search", workflow="w1")
+        broadcaster.publish({"id": "parser step"}, agent="parser", workflow="w1")
+        broadcaster.publish({"id": "status"}, workflow="w1")
+        await asyncio.sleep(0.01)
+        return [message["id"] for message in websocket.sent]
+
+    assert asyncio.run(scenario()) == ["search step"]
+
+def test_slow_subscriber_is_evicted_and_closed():
+    async def scenario():
+        broadcaster = Broadcaster(send_timeout=0.01)
+        websocket = FakeWebSocket(send_delay=1.0)
+        subscriber = broadcaster.subscribe(websocket)
+        broadcaster.publish({"type": "workflow_update"}, workflow="w1")
+        await asyncio.sleep(0.05)
+        return broadcaster, subscriber, websocket
+
+    broadcaster, subscriber, websocket = asyncio.run(scenario())
+    assert subscriber.closed
+    assert broadcaster.subscribers == {}
+    assert broadcaster.pruned == 1
+    assert websocket.close_code == 1013
@@ -0,0 +1,36 @@
+import time
+from checkpoint_store import CheckpointStore
+
+def _checkpoint(workflow_id="w1", status="running", steps=0):
+    return {"workflow_id": workflow_id, "fingerprint": "fp", "status": status, "steps": [{}] * steps}
+
+def test_heartbeat_keeps_a_live_run_from_looking_abandoned(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    worker, other = CheckpointStore(path), CheckpointStore(path)
+    worker.save(_checkpoint())
+    time.sleep(0.05)
+    assert other.is_abandoned(other.load("w1"), stale_after=0.04)
+
+    assert worker.heartbeat("w1")
+    assert not other.is_abandoned(other.load("w1"), stale_after=0.04)
+
+def test_only_one_process_claims_an_abandoned_run(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    CheckpointStore(path).save(_checkpoint())
+    first, second = CheckpointStore(path), CheckpointStore(path)
+    seen_by_first, seen_by_second = first.load("w1"), second.load("w1")
+
+    assert first.claim(seen_by_first)
+    assert not second.claim(seen_by_second)
+    assert first.load("w1")["owner"] == first.owner
+
+def test_previous_owner_cannot_overwrite_a_claimed_run(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    previous, current = CheckpointStore(path), CheckpointStore(path)
+    previous.save(_checkpoint(steps=1))
+    assert current.claim(current.load("w1"))
+
+    previous.save(_checkpoint(steps=2))
+    assert not previous.heartbeat("w1")
+    current.save(_checkpoint(steps=3))
+    assert len(current.load("w1")["steps"]) == 3
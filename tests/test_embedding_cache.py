@@ -0,0 +1,39 @@
+import os
+from multiprocessing import Process
+import numpy as np
+from embedding_cache import MmapVectorFile
+
+def _write_rows(directory, worker):
+    store = MmapVectorFile(directory)
+    for i in range(200):
+        store.put(f"{worker}-{i}", [float(worker * 1000 + i)] * 4)
+
+def test_shared_directory_keeps_rows_aligned(tmp_path):
+    workers = [Process(target=_write_rows, args=(str(tmp_path), worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    store = MmapVectorFile(str(tmp_path))
+    assert len(store) == 800
+    for worker in range(4):
+        for i in range(200):
+            assert store.get(f"{worker}-{i}")[0] == worker * 1000 + i
+
+def test_sees_rows_written_by_another_instance(tmp_path):
+    reader = MmapVectorFile(str(tmp_path))
+    writer = MmapVectorFile(str(tmp_path))
+    writer.put("a", [1.0, 2.0])
+    np.testing.assert_array_equal(reader.get("a"), [1.0, 2.0])
+
+def test_torn_tail_is_dropped(tmp_path):
+    store = MmapVectorFile(str(tmp_path))
+    store.put("a", [1.0, 2.0])
+    with open(os.path.join(str(tmp_path), "vectors.f32"), "ab") as f:
+        f.write(b"\0" * 4)
+
+    reopened = MmapVectorFile(str(tmp_path))
+    reopened.put("b", [3.0, 4.0])
+    np.testing.assert_array_equal(reopened.get("a"), [1.0, 2.0])
+    np.testing.assert_array_equal(reopened.get("b"), [3.0, 4.0])
@@ -0,0 +1,59 @@
+from ingestion import BulkIngestor
+
+class FakeEmbeddings:
+    """Fails every call after the first `ok_calls`"""
+    def __init__(self, ok_calls):
+        self.ok_calls = ok_calls
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls > self.ok_calls:
+            raise RuntimeError("embedding service unavailable")
+        return [[1.0, 0.0] for _ in texts]
+
+class FakeVectorStore:
+    def __init__(self, embeddings, fail_delete=False):
+        self.embeddings = embeddings
+        self.fail_delete = fail_delete
+        self.chunks = {}
+
+    @staticmethod
+    def sanitize_metadata(metadata):
+        return dict(metadata)
+
+    def upsert_embeddings(self, documents, embeddings, ids):
+        self.chunks.update(zip(ids, documents))
+
+    def delete(self, ids):
+        if self.fail_delete:
+            raise RuntimeError("collection locked")
+        for chunk_id in ids:
+            self.chunks.pop(chunk_id, None)
+
+def _ingestor(store):
+    return BulkIngestor(store, batch_size=2, chunk_size=20, chunk_overlap=0)
+
+def test_document_split_across_batches_is_rolled_back():
+    store = FakeVectorStore(FakeEmbeddings(ok_calls=1))
+    text = " ".join(f"word{i}" for i in range(12))
+    result = _ingestor(store).ingest([(text, {})])
+    document = result["documents"][0]
+    assert document["chunks_created"] > 2
+    assert document["status"] == "error"
+    assert store.chunks == {}
+
+def test_failed_rollback_is_reported_as_partial():
+    store = FakeVectorStore(FakeEmbeddings(ok_calls=1), fail_delete=True)
+    text = " ".join(f"word{i}" for i in range(12))
+    document = _ingestor(store).ingest([(text, {})])["documents"][0]
+    assert document["status"] == "partial"
+    assert document["failed_chunk_ids"]
+    assert not set(document["failed_chunk_ids"]) & set(store.chunks)
+
+def test_other_documents_are_unaffected():
+    store = FakeVectorStore(FakeEmbeddings(ok_calls=1))
+    result = _ingestor(store).ingest([("alpha", {}), ("beta", {}), ("gamma", {})])
+    statuses = [document["status"] for document in result["documents"]]
+    assert statuses == ["success", "success", "error"]
+    assert len(store.chunks) == 2
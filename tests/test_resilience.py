@@ -0,0 +1,49 @@
+import time
+import pytest
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient_error
+
+def test_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("tavily", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+def test_half_open_allows_one_probe_then_closes():
+    breaker = CircuitBreaker("tavily", failure_threshold=1, reset_timeout=0.01)
+    breaker.before_call()
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = CircuitBreaker("tavily", failure_threshold=1, reset_timeout=0.01)
+    breaker.before_call()
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+def test_transient_classification():
+    class RateLimitError(Exception):
+        pass
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(RateLimitError())
+    assert not is_transient_error(ValueError("bad input"))
+    assert not is_transient_error(CircuitOpenError("open"))
+
+def test_retry_delay_is_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=2)
+    assert all(0 <= policy.delay(attempt) <= 2 for attempt in range(1, 10))
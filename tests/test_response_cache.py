@@ -0,0 +1,25 @@
+from cache import ResponseCache
+
+def test_exact_hit_matches_normalized_query():
+    cache = ResponseCache()
+    cache.set("What is RAG?", "answer")
+    assert cache.get_exact("  what is rag ") == "answer"
+    assert cache.get("what is rag") == "answer"
+
+def test_semantic_tier_needs_an_embedding():
+    cache = ResponseCache(max_distance=0.1)
+    cache.set("What is RAG?", "answer", [1.0, 0.0])
+    assert cache.get_exact("explain retrieval augmented generation") is None
+    assert cache.get_similar([0.99, 0.05]) == "answer"
+    assert cache.get_similar([0.0, 1.0]) is None
+
+def test_answer_from_before_invalidation_is_not_cached():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("What is RAG?", "stale answer", generation=generation)
+    assert cache.get("What is RAG?") is None
+    assert cache.stats()["stale_skips"] == 1
+
+    cache.set("What is RAG?", "fresh answer", generation=cache.generation)
+    assert cache.get("What is RAG?") == "fresh answer"
@@ -0,0 +1,21 @@
+from rule_parser import RuleBasedQueryParser, is_time_sensitive
+
+def test_keeps_short_acronyms():
+    parsed = RuleBasedQueryParser().parse("latest news on AI")
+    assert parsed["key_terms"] == ["latest", "news", "AI"]
+    assert parsed["time_sensitive"]
+
+def test_drops_short_lowercase_words():
+    parsed = RuleBasedQueryParser().parse("go to ML ops UI docs")
+    assert "go" not in parsed["key_terms"]
+    assert {"ML", "UI"} <= set(parsed["key_terms"])
+
+def test_keeps_identifiers_whole():
+    parsed = RuleBasedQueryParser().parse("why does ERR-42 happen in v1.2.3")
+    assert "ERR-42" in parsed["key_terms"]
+    assert "v1.2.3" in parsed["key_terms"]
+    assert parsed["request_type"] == "explanation"
+
+def test_time_sensitivity():
+    assert is_time_sensitive("current price of gold")
+    assert not is_time_sensitive("what is a vector database")
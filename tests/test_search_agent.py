@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+from agents import SearchAgent, SearchError
+
+class FakeSearchTool:
+    """Local stand-in for Tavily: returns canned hits and counts calls"""
+    def __init__(self, results=None):
+        self.results = results if results is not None else [
+            {"url": "https://example.com/a", "content": "First hit"},
+            {"url": "", "content": "Second hit"}
+        ]
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        return self.results
+
+    async def ainvoke(self, query):
+        return self.invoke(query)
+
+def test_direct_mode_formats_results():
+    tool = FakeSearchTool()
+    agent = SearchAgent(mode="direct", search_tool=tool)
+    assert agent.search("What is RAG?") == "First hit (source: https://example.com/a)\n\nSecond hit"
+    assert tool.calls == 1
+
+def test_normalized_repeat_is_a_cache_hit():
+    tool = FakeSearchTool()
+    agent = SearchAgent(mode="direct", search_tool=tool)
+    first = agent.search("What is RAG?")
+    assert agent.search("  what is   rag ") == first
+    assert asyncio.run(agent.asearch("what is rag")) == first
+    assert tool.calls == 1
+    assert agent.cache.stats()["hits"] == 2
+
+def test_cache_entries_expire():
+    tool = FakeSearchTool()
+    agent = SearchAgent(mode="direct", search_tool=tool, cache_ttl=0.05)
+    agent.search("What is RAG?")
+    time.sleep(0.1)
+    agent.search("What is RAG?")
+    assert tool.calls == 2
+
+def test_failed_search_raises_and_is_not_cached():
+    tool = FakeSearchTool(results="HTTPError('429 Client Error: Too Many Requests')")
+    agent = SearchAgent(mode="direct", search_tool=tool)
+    with pytest.raises(SearchError, match="429"):
+        agent.search("What is RAG?")
+    with pytest.raises(SearchError):
+        asyncio.run(agent.asearch("What is RAG?"))
+    assert tool.calls == 2
+    assert len(agent.cache) == 0
@@ -0,0 +1,30 @@
+from state_summary import StateSummarizer
+
+def test_unchanged_large_values_collapse_to_a_hash():
+    summarizer = StateSummarizer(blob_chars=10)
+    state = {"query": "q", "documents": "x" * 50}
+    summarizer.summarize(state)
+    second = summarizer.summarize(state)
+    assert "query: q" in second
+    assert "documents: <unchanged, 50 chars, sha1:" in second
+
+def test_changed_and_removed_keys_are_marked():
+    summarizer = StateSummarizer()
+    summarizer.summarize({"a": 1, "b": 2})
+    summary = summarizer.summarize({"a": 3})
+    assert "a (changed): 3" in summary
+    assert "b: <removed>" in summary
+
+def test_omitted_keys_are_not_treated_as_seen():
+    summarizer = StateSummarizer(max_value_chars=1000, max_total_chars=200)
+    state = {"big": "y" * 500, "small": "ok"}
+    first = summarizer.summarize(state)
+    # The oversized line is skipped without dropping the small key after it
+    assert "small (changed): ok" in first
+    assert "big" not in first.split("\n")[1]
+    assert "1 more keys omitted" in first
+
+    summarizer.max_total_chars = 2000
+    second = summarizer.summarize(state)
+    assert "big (changed):" in second
+    assert "unchanged" not in second.split("big")[1].split("\n")[0]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+from workflow_ids import id_floor, id_timestamp, new_workflow_id
+from workflow_store import WorkflowStore
+
+class FakeWorkflow:
+    def __init__(self, workflow_id, status="running"):
+        self.workflow_id = workflow_id
+        self.status = status
+
+def test_ids_are_strictly_increasing():
+    ids = [new_workflow_id() for _ in range(1000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+def test_id_floor_accepts_aware_timestamps():
+    naive = datetime(2026, 1, 1, 12, 0)
+    aware = datetime(2026, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert id_floor(aware) == id_floor(naive)
+    assert id_timestamp(id_floor(naive)) == naive
+
+def test_re_added_workflow_is_listed_once():
+    store = WorkflowStore()
+    first, second = new_workflow_id(), new_workflow_id()
+    store.add(first, FakeWorkflow(first))
+    store.add(second, FakeWorkflow(second))
+    store.archive_workflow(first, {"workflow_id": first})
+    store.add(first, FakeWorkflow(first))
+    store.add(second, FakeWorkflow(second))
+
+    listed = [workflow.workflow_id for workflow in store.list_active()]
+    assert listed == [first, second]
+    assert [w.workflow_id for w in store.list_active(status="running")] == [first, second]
+
+def test_started_after_filters_by_id_time():
+    store = WorkflowStore()
+    workflow_id = new_workflow_id()
+    store.add(workflow_id, FakeWorkflow(workflow_id))
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    assert store.list_active(started_after=later) == []
+    assert len(store.list_active(started_after=later - timedelta(minutes=5))) == 1
@@ -1,25 +1,200 @@
 import chromadb
+import os
+import threading
+import numpy as np
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from langchain.docstore.document import Document
+from concurrency import run_blocking
+from embedding_cache import CachedEmbeddings
+from lexical_index import BM25Index
 
 class ChromaVectorStore:
-    def __init__(self, collection_name: str = "default_collection"):
-        self.embeddings = HuggingFaceEmbeddings()
+    """Chroma collection plus an in-memory BM25 index over the same chunks.
+
+    The BM25 index is updated on every write made through this class and is
+    rebuilt from the collection when a persistent collection is opened.
+    `hybrid_search_with_score` fuses the dense and lexical rankings.
+    """
+    def __init__(self, collection_name: str = "default_collection", persist_directory: Optional[str] = None):
+        # Shared by the query and ingestion paths so identical text is embedded once
+        self.embeddings = CachedEmbeddings(
+            HuggingFaceEmbeddings(),
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")),
+            cache_dir=os.getenv("EMBEDDING_CACHE_DIR") or None
+        )
         self.collection_name = collection_name
+        self.persist_directory = persist_directory
         self.vector_store = None
+        self._open_lock = threading.Lock()
+        self.lexical_index = BM25Index()
 
     def initialize_store(self, documents: List[Document]):
-        """Initialize the vector store with documents"""
-        self.vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            collection_name=self.collection_name
+        """Add documents to the collection, opening it first if needed.
+
+        With a persist directory the collection survives restarts, so this
+        only embeds the documents passed in rather than rebuilding the corpus.
+        """
+        ids = self._get_store().add_documents(documents)
+        self.lexical_index.add(ids, [doc.page_content for doc in documents])
+
+    def _get_store(self) -> Chroma:
+        """Open the collection on first use; persistent collections are reused as-is"""
+        if not self.vector_store:
+            with self._open_lock:
+                if not self.vector_store:
+                    store = Chroma(
+                        collection_name=self.collection_name,
+                        embedding_function=self.embeddings,
+                        persist_directory=self.persist_directory
+                    )
+                    self._rebuild_lexical_index(store)
+                    self.vector_store = store
+        return self.vector_store
+
+    def _rebuild_lexical_index(self, store: Chroma, page_size: int = 1000):
+        """Index chunks that were persisted by an earlier process"""
+        self.lexical_index.clear()
+        offset = 0
+        while True:
+            page = store._collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            self.lexical_index.add(page["ids"], [text or "" for text in page["documents"]])
+            offset += len(page["ids"])
+
+    def count(self) -> int:
+        """Number of chunks stored in the collection"""
+        return self._get_store()._collection.count()
+
+    @staticmethod
+    def sanitize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Chroma only stores scalar metadata values, so stringify everything else"""
+        return {
+            key: value if isinstance(value, (str, int, float, bool)) else str(value)
+            for key, value in metadata.items()
+            if value is not None
+        }
+
+    def upsert_embeddings(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]):
+        """Write pre-computed embeddings in a single bulk upsert"""
+        self._get_store()._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents]
         )
+        self.lexical_index.add(ids, [doc.page_content for doc in documents])
+
+    def delete(self, ids: List[str]):
+        """Remove chunks by ID from the collection and the BM25 index"""
+        self._get_store()._collection.delete(ids=ids)
+        self.lexical_index.remove(ids)
 
     def similarity_search_with_score(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
         """Perform similarity search and return documents with scores"""
-        if not self.vector_store:
-            raise ValueError("Vector store not initialized")
-        return self.vector_store.similarity_search_with_score(query, k=k)
\ No newline at end of file
+        return self._get_store().similarity_search_with_score(query, k=k)
+
+    def hybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 3,
+        fetch_k: int = 20,
+        rrf_k: int = 60
+    ) -> List[Tuple[Document, float]]:
+        """Dense and BM25 results fused by reciprocal rank fusion.
+
+        Each ranking contributes 1 / (rrf_k + rank) per chunk. Results come back
+        in fused order, with each chunk's dense distance as its score (lower is
+        closer), so callers can keep treating scores as distances.
+        """
+        _, candidates = self.search_candidates(query, k=k, fetch_k=fetch_k, rrf_k=rrf_k)
+        return [(doc, distance) for doc, distance, _ in candidates]
+
+    def search_candidates(
+        self,
+        query: str,
+        k: int = 50,
+        fetch_k: int = 50,
+        rrf_k: int = 60,
+        hybrid: bool = True
+    ) -> Tuple[List[float], List[Tuple[Document, float, List[float]]]]:
+        """The query embedding and up to k (document, distance, embedding) candidates.
+
+        Candidates are in dense order, or fused order when `hybrid` is set.
+        Stored embeddings come back with them so a rerank stage needs no
+        further embedding calls.
+        """
+        store = self._get_store()
+        query_embedding = self.embeddings.embed_query(query)
+        dense = store._collection.query(
+            query_embeddings=[query_embedding],
+            n_results=max(k, fetch_k) if hybrid else k,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+        found = {
+            doc_id: (Document(page_content=text, metadata=metadata or {}), distance, embedding)
+            for doc_id, text, metadata, distance, embedding in zip(
+                dense["ids"][0],
+                dense["documents"][0],
+                dense["metadatas"][0],
+                dense["distances"][0],
+                dense["embeddings"][0]
+            )
+        }
+        if not hybrid:
+            return query_embedding, [found[doc_id] for doc_id in dense["ids"][0]]
+
+        lexical = self.lexical_index.search(query, k=fetch_k)
+        fused: Dict[str, float] = {}
+        for rank, doc_id in enumerate(dense["ids"][0]):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+        for rank, (doc_id, _) in enumerate(lexical):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+        top_ids = sorted(fused, key=fused.get, reverse=True)[:k]
+
+        lexical_only = [doc_id for doc_id in top_ids if doc_id not in found]
+        if lexical_only:
+            found.update(self._score_by_id(store, lexical_only, query_embedding))
+        return query_embedding, [found[doc_id] for doc_id in top_ids if doc_id in found]
+
+    def _score_by_id(
+        self,
+        store: Chroma,
+        ids: List[str],
+        query_embedding: List[float]
+    ) -> Dict[str, Tuple[Document, float, List[float]]]:
+        """Load chunks by ID and compute their distance with the collection's metric"""
+        rows = store._collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        if not len(rows["ids"]):
+            return {}
+        embeddings = np.asarray(rows["embeddings"], dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        space = (store._collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "cosine":
+            norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector)
+            distances = 1 - embeddings @ query_vector / np.maximum(norms, 1e-12)
+        elif space == "ip":
+            distances = 1 - embeddings @ query_vector
+        else:
+            # Chroma's l2 space reports squared distances
+            distances = ((embeddings - query_vector) ** 2).sum(axis=1)
+        return {
+            doc_id: (Document(page_content=text, metadata=metadata or {}), float(distance), embedding)
+            for doc_id, text, metadata, distance, embedding in zip(
+                rows["ids"], rows["documents"], rows["metadatas"], distances, embeddings
+            )
+        }
+
+    async def ahybrid_search_with_score(self, query: str, k: int = 3, fetch_k: int = 20, rrf_k: int = 60) -> List[Tuple[Document, float]]:
+        """Async variant of hybrid_search_with_score, run on the shared executor"""
+        return await run_blocking(self.hybrid_search_with_score, query, k=k, fetch_k=fetch_k, rrf_k=rrf_k)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """Async variant of similarity_search_with_score.
+
+        Chroma and the embedding model are both blocking, so the search runs
+        on the shared bounded executor instead of the event loop.
+        """
+        return await run_blocking(self.similarity_search_with_score, query, k=k)
\ No newline at end of file
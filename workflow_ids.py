@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+import os
+import threading
+import time
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+class ULIDGenerator:
+    """ULID-style IDs: 48-bit millisecond timestamp + 80 random bits, Crockford base32.
+
+    IDs sort lexicographically by creation time. Within one millisecond the
+    random part is incremented instead of redrawn, so IDs from this process
+    stay strictly increasing even at very high rates.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                random_part = self._last_random + 1
+                if random_part >> _RANDOM_BITS:
+                    ms += 1
+                    random_part = int.from_bytes(os.urandom(10), "big")
+            else:
+                random_part = int.from_bytes(os.urandom(10), "big")
+            self._last_ms = ms
+            self._last_random = random_part
+        return _encode((ms << _RANDOM_BITS) | random_part, 26)
+
+def id_floor(timestamp: datetime) -> str:
+    """Smallest ID that could be generated at `timestamp`, for range lookups.
+
+    Naive timestamps are taken as UTC; aware ones are converted to it.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    ms = int((timestamp - datetime(1970, 1, 1)).total_seconds() * 1000)
+    return _encode(ms << _RANDOM_BITS, 26)
+
+def id_timestamp(workflow_id: str) -> datetime:
+    """Creation time encoded in an ID"""
+    value = 0
+    for char in workflow_id[:10]:
+        value = value * 32 + _CROCKFORD.index(char)
+    return datetime.utcfromtimestamp(value / 1000)
+
+_generator = ULIDGenerator()
+
+def new_workflow_id() -> str:
+    return _generator.new()
\ No newline at end of file
@@ -0,0 +1,149 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from datetime import datetime
+from workflow_ids import id_floor
+import bisect
+import json
+import os
+import threading
+
+class WorkflowStore:
+    """Active workflows plus a bounded archive of finished ones.
+
+    Finished workflows are moved out of `active` as compact summaries. The
+    archive keeps at most `max_archived` of them and drops the oldest first.
+    If `spill_path` is set, callers pass each full record to `spill`, which
+    appends it to a JSONL file; it does blocking I/O, so async callers should
+    run it on an executor.
+
+    Active workflows are indexed by status and by ID. IDs are time-sortable,
+    so the ID list doubles as a start-time index: status lookups are O(1)
+    and start-time range queries are a bisect.
+    """
+    def __init__(self, max_archived: int = 1000, spill_path: Optional[str] = None):
+        self.active: Dict[str, Any] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._indexed_status: Dict[str, str] = {}
+        self._order: List[str] = []
+        self._order_removed = 0
+        self.archive: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_archived = max_archived
+        self.spill_path = spill_path
+        self._spill_lock = threading.Lock()
+        self._archive_bytes: Dict[str, int] = {}
+        self.archived_total = 0
+        self.evicted_total = 0
+        self.spilled_total = 0
+
+    def add(self, workflow_id: str, workflow_state: Any):
+        if workflow_id in self.active:
+            self._unindex(workflow_id)
+        self.active[workflow_id] = workflow_state
+        self._index(workflow_id, workflow_state.status)
+        # New IDs are always the largest, so this is normally an append
+        if not self._order or self._order[-1] < workflow_id:
+            self._order.append(workflow_id)
+        else:
+            # A re-added ID (e.g. a resumed workflow) may still be in the lazily cleaned list
+            position = bisect.bisect_left(self._order, workflow_id)
+            if position == len(self._order) or self._order[position] != workflow_id:
+                self._order.insert(position, workflow_id)
+
+    def _index(self, workflow_id: str, status: str):
+        self._by_status.setdefault(status, {})[workflow_id] = None
+        self._indexed_status[workflow_id] = status
+
+    def _unindex(self, workflow_id: str):
+        status = self._indexed_status.pop(workflow_id, None)
+        if status is not None:
+            self._by_status[status].pop(workflow_id, None)
+
+    def update_status(self, workflow_id: str):
+        """Re-index a workflow after its status changed"""
+        workflow_state = self.active.get(workflow_id)
+        if workflow_state is not None and self._indexed_status.get(workflow_id) != workflow_state.status:
+            self._unindex(workflow_id)
+            self._index(workflow_id, workflow_state.status)
+
+    def _remove(self, workflow_id: str):
+        if self.active.pop(workflow_id, None) is None:
+            return
+        self._unindex(workflow_id)
+        # The ID list is cleaned lazily and compacted once mostly stale
+        self._order_removed += 1
+        if self._order_removed > len(self.active) and self._order_removed > 64:
+            self._order = [wid for wid in self._order if wid in self.active]
+            self._order_removed = 0
+
+    def list_active(
+        self,
+        status: Optional[str] = None,
+        started_after: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """Active workflows, oldest first, optionally filtered by status and start time"""
+        if status is not None:
+            ids = list(self._by_status.get(status, {}))
+            if started_after is not None:
+                floor = id_floor(started_after)
+                ids = [wid for wid in ids if wid >= floor]
+            ids.sort()
+        else:
+            start = bisect.bisect_left(self._order, id_floor(started_after)) if started_after else 0
+            ids = (wid for wid in self._order[start:] if wid in self.active)
+
+        workflows = []
+        for workflow_id in ids:
+            if limit is not None and len(workflows) >= limit:
+                break
+            workflows.append(self.active[workflow_id])
+        return workflows
+
+    def count_by_status(self) -> Dict[str, int]:
+        return {status: len(ids) for status, ids in self._by_status.items() if ids}
+
+    def get(self, workflow_id: str) -> Optional[Any]:
+        return self.active.get(workflow_id)
+
+    def get_archived(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        return self.archive.get(workflow_id)
+
+    def archive_workflow(self, workflow_id: str, summary: Dict[str, Any]):
+        """Replace an active workflow with its summary"""
+        self._remove(workflow_id)
+
+        self.archive[workflow_id] = summary
+        self.archive.move_to_end(workflow_id)
+        self._archive_bytes[workflow_id] = len(json.dumps(summary, default=str))
+        self.archived_total += 1
+
+        while len(self.archive) > self.max_archived:
+            evicted_id, _ = self.archive.popitem(last=False)
+            self._archive_bytes.pop(evicted_id, None)
+            self.evicted_total += 1
+
+    def spill(self, record: Dict[str, Any]):
+        """Append a full workflow record to the JSONL spill file; blocking file I/O"""
+        line = json.dumps(record, default=str)
+        with self._spill_lock:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, "a") as f:
+                f.write(line + "\n")
+        self.spilled_total += 1
+
+    def history(self) -> List[Dict[str, Any]]:
+        return list(self.archive.values())
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {
+            "active_workflows": len(self.active),
+            "active_by_status": self.count_by_status(),
+            "archived_workflows": len(self.archive),
+            "max_archived": self.max_archived,
+            "archive_bytes": sum(self._archive_bytes.values()),
+            "archived_total": self.archived_total,
+            "evicted_total": self.evicted_total,
+            "spilled_total": self.spilled_total
+        }
\ No newline at end of file